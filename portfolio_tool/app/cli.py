@@ -62,6 +62,7 @@ def _build_pricing_service(repo, config: dict) -> PricingService:
         stale_price_max_minutes=stale_max,
         timezone=timezone,
         exchange_suffix_map=suffix_map,
+        adaptive_ttl=bool(prices_cfg.get("adaptive_ttl", False)),
     )
 
 
@@ -137,14 +138,6 @@ def _handle_export(
     print(f"[green]Exported report to {target}")
 
 
-def _symbols_with_open_lots(repo) -> list[str]:
-    if hasattr(repo, "aggregate_open_lots"):
-        aggregates = repo.aggregate_open_lots()
-        return [row["symbol"] for row in aggregates]
-    rows = repo.list_lots(only_open=True)
-    return sorted({row["symbol"] for row in rows})
-
-
 def _actionable_rows(items: Sequence) -> list[dict[str, object]]:
     rows: list[dict[str, object]] = []
     for item in items:
@@ -305,18 +298,15 @@ def positions(
     config = load_config()
     repo = _open_repository(config)
     tz_name = config.get("timezone", "Australia/Brisbane")
+    pricing: PricingService | None = None
     try:
         portfolio = _portfolio_service(repo, config)
         reporting = _reporting_service(repo, config, portfolio)
         set_reporting_engine(reporting)
         pricing = _build_pricing_service(repo, config)
         asof_dt = _parse_asof_option(asof, tz_name) or datetime.now(tz=ZoneInfo(tz_name))
-        symbols = _symbols_with_open_lots(repo)
-        quotes = (
-            pricing.refresh_prices(symbols or None)
-            if refresh_prices
-            else pricing.get_cached(symbols)
-        )
+        symbols = portfolio.open_symbols()
+        quotes = pricing.get_quotes(symbols, refresh=refresh_prices)
         rows = reporting.positions_snapshot(asof_dt, quotes)
         if rows:
             _render_table(rows, POSITIONS_COLUMNS)
@@ -324,6 +314,8 @@ def positions(
             print("[yellow]No open positions[/yellow]")
         _handle_export(export, rows, fieldnames=POSITIONS_FIELDS)
     finally:
+        if pricing is not None:
+            pricing.close()
         set_reporting_engine(None)
         repo.close()
 
@@ -417,6 +409,7 @@ def actionables(
     config = load_config()
     repo = _open_repository(config)
     tz_name = config.get("timezone", "Australia/Brisbane")
+    pricing: PricingService | None = None
     try:
         portfolio = _portfolio_service(repo, config)
         reporting = _reporting_service(repo, config, portfolio)
@@ -449,6 +442,8 @@ def actionables(
         else:
             print("[yellow]No actionables[/yellow]")
     finally:
+        if pricing is not None:
+            pricing.close()
         repo.close()
 
 
@@ -469,18 +464,15 @@ def report_daily(
     config = load_config()
     repo = _open_repository(config)
     tz_name = config.get("timezone", "Australia/Brisbane")
+    pricing: PricingService | None = None
     try:
         portfolio = _portfolio_service(repo, config)
         reporting = _reporting_service(repo, config, portfolio)
         set_reporting_engine(reporting)
         pricing = _build_pricing_service(repo, config)
         asof_dt = datetime.now(tz=ZoneInfo(tz_name))
-        symbols = _symbols_with_open_lots(repo)
-        quotes = (
-            pricing.refresh_prices(symbols or None)
-            if refresh_prices
-            else pricing.get_cached(symbols)
-        )
+        symbols = portfolio.open_symbols()
+        quotes = pricing.get_quotes(symbols, refresh=refresh_prices)
         rows = reporting.positions_snapshot(asof_dt, quotes)
         if rows:
             print(
@@ -491,6 +483,8 @@ def report_daily(
             print("[yellow]No positions to report[/yellow]")
         _handle_export(export, rows, fieldnames=POSITIONS_FIELDS)
     finally:
+        if pricing is not None:
+            pricing.close()
         set_reporting_engine(None)
         repo.close()
 
@@ -513,12 +507,15 @@ def prices_show(symbols: list[str] = typer.Argument(None)) -> None:
 
     config = load_config()
     repo = _open_repository(config)
+    service: PricingService | None = None
     try:
         service = _build_pricing_service(repo, config)
         targets = symbols or _known_symbols(repo)
         quotes = service.get_cached(targets)
         _render_quotes(quotes.values())
     finally:
+        if service is not None:
+            service.close()
         repo.close()
 
 
@@ -528,12 +525,15 @@ def prices_refresh(symbols: list[str] = typer.Argument(None)) -> None:
 
     config = load_config()
     repo = _open_repository(config)
+    service: PricingService | None = None
     try:
         service = _build_pricing_service(repo, config)
         targets = symbols or _known_symbols(repo)
         quotes = service.refresh_prices(targets or None)
         _render_quotes(quotes.values())
     finally:
+        if service is not None:
+            service.close()
         repo.close()
 
 
@@ -550,12 +550,15 @@ def prices_set(
 
     config = load_config()
     repo = _open_repository(config)
+    service: PricingService | None = None
     try:
         service = _build_pricing_service(repo, config)
         asof_dt = datetime.fromisoformat(asof) if asof else None
         quotes = service.set_manual(symbol, price, asof_dt)
         _render_quotes(quotes.values())
     finally:
+        if service is not None:
+            service.close()
         repo.close()
 
 
@@ -153,6 +153,7 @@ class PortfolioApp(App[None]):
     # ------------------------------------------------------------------
     def on_unmount(self) -> None:
         if self.services:
+            self.services.pricing.close()
             self.services.repo.close()
 
     # ------------------------------------------------------------------
@@ -179,6 +180,7 @@ class PortfolioApp(App[None]):
             stale_price_max_minutes=config.get("prices", {}).get("stale_price_max_minutes", 60),
             timezone=config.get("timezone", "Australia/Brisbane"),
             exchange_suffix_map=config.get("prices", {}).get("exchange_suffix_map", {}),
+            adaptive_ttl=bool(config.get("prices", {}).get("adaptive_ttl", False)),
         )
         actionables = ActionableService(
             repo,
@@ -27,15 +27,10 @@ class DashboardView(PortfolioView):
         tz_name = services.config.get("timezone", "Australia/Brisbane")
         tz = ZoneInfo(tz_name)
         pricing = services.pricing
-        repo = services.repo
         reporting = services.reporting
         actionables = services.actionables
 
-        if hasattr(repo, "aggregate_open_lots"):
-            aggregates = repo.aggregate_open_lots()
-            symbols = [row["symbol"] for row in aggregates]
-        else:
-            symbols = sorted({row["symbol"] for row in repo.list_lots(only_open=True)})
+        symbols = services.portfolio.open_symbols()
         quotes = pricing.get_cached(symbols)
         snapshot = reporting.positions_snapshot(datetime.now(tz=tz), quotes)
         total_mv = 0.0
@@ -37,14 +37,9 @@ class PositionsView(TableView):
             self._rows = []
             return
         tz = ZoneInfo(services.config.get("timezone", "Australia/Brisbane"))
-        repo = services.repo
         reporting = services.reporting
         pricing = services.pricing
-        if hasattr(repo, "aggregate_open_lots"):
-            aggregates = repo.aggregate_open_lots()
-            symbols = [row["symbol"] for row in aggregates]
-        else:
-            symbols = sorted({row["symbol"] for row in repo.list_lots(only_open=True)})
+        symbols = services.portfolio.open_symbols()
         quotes = pricing.get_cached(symbols)
         snapshot = reporting.positions_snapshot(datetime.now(tz=tz), quotes)
         self._rows = snapshot
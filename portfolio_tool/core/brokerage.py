@@ -49,9 +49,9 @@ def allocate_fees(
     if total_fees == 0:
         return allocation
 
+    fee_per_notional = total_fees / total_abs
     for identifier, amount in filtered:
-        share = abs(amount) / total_abs
-        allocation[identifier] = total_fees * share
+        allocation[identifier] = abs(amount) * fee_per_notional
     return allocation
 
 
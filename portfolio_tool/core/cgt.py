@@ -10,10 +10,11 @@ from zoneinfo import ZoneInfo
 from .models import Disposal, Lot, Transaction
 
 
-def cgt_threshold(acquired_at: datetime, tz: str) -> datetime:
+def cgt_threshold(acquired_at: datetime, tz: str | ZoneInfo) -> datetime:
     """Return the CGT discount threshold date in the configured timezone."""
 
-    aware_acquired = acquired_at.astimezone(ZoneInfo(tz))
+    tzinfo = tz if isinstance(tz, ZoneInfo) else ZoneInfo(tz)
+    aware_acquired = acquired_at.astimezone(tzinfo)
     return aware_acquired + timedelta(days=365)
 
 
@@ -41,8 +42,9 @@ class CGTEngine:
             raise ValueError("Total disposal quantity must be positive")
         fee_per_unit = fees_allocated / total_qty if fees_allocated else 0.0
 
-        tzinfo = ZoneInfo(self.timezone)
-        sell_dt = sell_txn.dt.astimezone(tzinfo)
+        # Eligibility is an absolute instant comparison, so epoch seconds avoid
+        # converting every lot threshold into the configured timezone.
+        sell_ts = sell_txn.dt.timestamp()
         slices: list[Disposal] = []
         for lot, qty in allocations:
             if qty <= 0:
@@ -54,8 +56,10 @@ class CGTEngine:
             gross_proceeds = sell_txn.price * qty
             fee_share = fee_per_unit * qty
             net_proceeds = gross_proceeds - fee_share
-            threshold = lot.threshold_date.astimezone(tzinfo) if lot.threshold_date else None
-            eligible = threshold is not None and sell_dt >= threshold
+            eligible = (
+                lot.threshold_date is not None
+                and sell_ts >= lot.threshold_date.timestamp()
+            )
             gain_loss = net_proceeds - cost_alloc
             slices.append(
                 Disposal(
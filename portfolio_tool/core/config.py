@@ -1,6 +1,9 @@
 """Configuration helpers for the portfolio tool."""
 from __future__ import annotations
 
+import copy
+import os
+from functools import lru_cache
 from pathlib import Path
 from typing import Any
 
@@ -37,12 +40,22 @@ def ensure_config(path: Path | None = None) -> Path:
     return target
 
 
+@lru_cache(maxsize=8)
+def _load_toml_cached(path_str: str, mtime_ns: int, size: int) -> dict[str, Any]:
+    """Parse the TOML file at *path_str*; keyed on stat data so edits invalidate."""
+
+    with open(path_str, "rb") as fh:
+        return tomllib.load(fh)
+
+
 def load_config(path: Path | None = None) -> dict[str, Any]:
     """Load configuration data from ``config.toml`` as a dictionary."""
 
     config_path = ensure_config(path)
-    with config_path.open("rb") as fh:
-        return tomllib.load(fh)
+    stat = os.stat(config_path)
+    parsed = _load_toml_cached(str(config_path.resolve()), stat.st_mtime_ns, stat.st_size)
+    # Callers (e.g. the TUI config view) mutate the result, so hand out a copy.
+    return copy.deepcopy(parsed)
 
 
 __all__ = ["ensure_config", "load_config", "DEFAULT_CONFIG_PATH", "DEFAULT_CONFIG_CONTENT"]
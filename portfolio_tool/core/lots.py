@@ -73,23 +73,35 @@ def match_disposal(
         return allocations
 
     if method == "FIFO":
-        ordered = sorted(open_lots, key=lambda lot: (lot.acquired_at, lot.lot_id or 0))
+        keys = [(lot.acquired_at, lot.lot_id or 0) for lot in open_lots]
+        # Repositories already return lots by (acquired_at, lot_id); only sort
+        # when the caller handed us something out of order.
+        if all(a <= b for a, b in zip(keys, keys[1:])):
+            ordered = open_lots
+        else:
+            ordered = sorted(open_lots, key=lambda lot: (lot.acquired_at, lot.lot_id or 0))
     else:  # HIFO
-        ordered = sorted(
-            open_lots,
-            key=lambda lot: (
+        # Decorate once so the sort compares plain tuples; negated unit cost
+        # keeps highest-cost first without reverse=True disturbing tie order.
+        keys = [
+            (
                 -(lot.cost_base_total / lot.qty_remaining),
                 lot.acquired_at,
                 lot.lot_id or 0,
-            ),
-        )
+                idx,
+            )
+            for idx, lot in enumerate(open_lots)
+        ]
+        keys.sort()
+        ordered = [open_lots[key[-1]] for key in keys]
 
     allocations = []
     remaining = sell_qty
     for lot in ordered:
         if remaining <= 0:
             break
-        take = min(lot.qty_remaining, remaining)
+        available = lot.qty_remaining
+        take = remaining if remaining < available else available
         allocations.append((lot, float(take)))
         remaining -= take
 
@@ -1,6 +1,8 @@
 """Pricing subsystem responsible for live quote retrieval and caching."""
 from __future__ import annotations
 
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Callable, Iterable, Mapping
@@ -10,6 +12,7 @@ from zoneinfo import ZoneInfo
 from ..data.repo_base import BaseRepository
 from ..plugins.pricing import ProviderPrice, PriceProvider
 from .models import PriceQuote
+from .timeutil import parse_iso
 
 
 @dataclass(slots=True)
@@ -20,6 +23,15 @@ class CachedRecord:
     source: str
     fetched_at: datetime
     stale: bool
+    volatility: float | None = None
+    ttl_seconds: float | None = None
+
+
+_LOG = logging.getLogger(__name__)
+
+_VOLATILITY_DECAY = 0.9
+_MIN_TTL_SECONDS = 30.0
+_MAX_TTL_SECONDS = 24 * 60 * 60.0
 
 
 class PricingService:
@@ -34,11 +46,15 @@ class PricingService:
         stale_price_max_minutes: int = 60,
         timezone: str = "Australia/Brisbane",
         exchange_suffix_map: Mapping[str, str] | None = None,
+        adaptive_ttl: bool = False,
+        target_volatility: float = 0.005,
         now_fn: Callable[[], datetime] | None = None,
     ) -> None:
         self.repo = repo
         self.provider = provider
         self.cache_ttl = timedelta(minutes=max(cache_ttl_minutes, 0))
+        self.adaptive_ttl = adaptive_ttl
+        self.target_volatility = max(target_volatility, 0.0)
         self.stale_window = timedelta(minutes=max(stale_price_max_minutes, 0))
         self.tz = ZoneInfo(timezone)
         self.exchange_suffix_map = {
@@ -46,56 +62,118 @@ class PricingService:
         }
         self._now = now_fn or (lambda: datetime.now(tz=self.tz))
         self._exchange_cache: dict[str, str | None] = {}
+        self._provider_symbol_cache: dict[str, str] = {}
+        self._executor: ThreadPoolExecutor | None = None
+        self._revalidation: Future | None = None
+
+    # ------------------------------------------------------------------
+    def close(self) -> None:
+        """Persist an in-flight background refresh and release provider resources.
+
+        Call before closing the repository so the refresh can still be stored.
+        """
+
+        self.apply_revalidation(wait=True)
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        # Providers with pooled connections (e.g. online_default) expose close().
+        close_provider = getattr(self.provider, "close", None)
+        if close_provider is not None:
+            close_provider()
 
     # ------------------------------------------------------------------
     def refresh_prices(self, symbols: list[str] | None = None) -> dict[str, PriceQuote]:
         """Fetch latest prices for ``symbols`` and store them in the cache."""
 
-        if symbols is None:
-            symbols = []
-        fetch_map = self._build_provider_symbol_map(symbols)
-        if not fetch_map:
+        if not symbols:
             return {}
+        return self._refresh(symbols, self.repo.get_prices(symbols))
 
-        try:
-            provider_results = self.provider.fetch(sorted(set(fetch_map.values())))
-        except Exception:
-            return {}
+    # ------------------------------------------------------------------
+    def get_cached(self, symbols: list[str]) -> dict[str, PriceQuote]:
+        """Return cached price quotes for the requested ``symbols``."""
 
-        now = self._now()
+        records = self.repo.get_prices(symbols)
+        cutoffs = self._stale_cutoffs(self._now())
         quotes: dict[str, PriceQuote] = {}
-        for symbol, provider_symbol in fetch_map.items():
-            data = provider_results.get(provider_symbol)
+        for symbol in symbols:
+            data = records.get(symbol)
             if not data:
                 continue
-            record = self._record_from_provider(symbol, data, now)
-            self._persist_record(record)
-            quotes[symbol] = self._quote_from_record(record)
+            quotes[symbol] = self._quote_from_row(symbol, data, cutoffs)
         return quotes
 
     # ------------------------------------------------------------------
-    def get_cached(self, symbols: list[str]) -> dict[str, PriceQuote]:
-        """Return cached price quotes for the requested ``symbols``."""
+    def get_quotes(
+        self,
+        symbols: list[str],
+        *,
+        refresh: bool = False,
+        stale_while_revalidate: bool = False,
+    ) -> dict[str, PriceQuote]:
+        """Return quotes for ``symbols``, optionally refreshing from the provider.
 
+        The price cache is read once in bulk; symbols the provider skips or
+        cannot serve (manual overrides, provider errors) fall back to the
+        cached rows from that same read.  With ``stale_while_revalidate`` the
+        refresh does not block: cached quotes are returned immediately while
+        stale or missing symbols are fetched on a background thread, and the
+        results are persisted by a later call (see ``apply_revalidation``).
+        """
+
+        if not symbols:
+            return {}
+        self.apply_revalidation()
         records = self.repo.get_prices(symbols)
-        now = self._now()
+        fresh: dict[str, PriceQuote] = {}
+        if refresh and not stale_while_revalidate:
+            fresh = self._refresh(symbols, records)
+        cutoffs = self._stale_cutoffs(self._now())
         quotes: dict[str, PriceQuote] = {}
         for symbol in symbols:
-            data = records.get(symbol)
-            if not data:
-                continue
-            record = self._record_from_row(symbol, data)
-            stale = record.stale or (now - record.fetched_at) > self.cache_ttl
-            stale = stale or (now - record.asof) > self.stale_window
-            quotes[symbol] = PriceQuote(
-                symbol=symbol,
-                asof=record.asof,
-                price=record.price,
-                source=record.source,
-                stale=stale,
-            )
+            quote = fresh.get(symbol)
+            if quote is None:
+                data = records.get(symbol)
+                if not data:
+                    continue
+                quote = self._quote_from_row(symbol, data, cutoffs)
+            quotes[symbol] = quote
+        if refresh and stale_while_revalidate:
+            pending = [
+                symbol
+                for symbol in symbols
+                if symbol not in quotes or quotes[symbol].stale
+            ]
+            self._submit_revalidation(pending, records)
         return quotes
 
+    # ------------------------------------------------------------------
+    def apply_revalidation(self, *, wait: bool = False) -> dict[str, PriceQuote]:
+        """Persist a finished background refresh and return the quotes it stored."""
+
+        future = self._revalidation
+        if future is None or (not wait and not future.done()):
+            return {}
+        self._revalidation = None
+        try:
+            fetch_map, provider_results, fetched_at = future.result()
+        except Exception:
+            _LOG.warning("Background price refresh failed", exc_info=True)
+            return {}
+        # Re-read the cache: a manual override set while the fetch was running
+        # must win over the provider quote, and volatility should build on the
+        # latest stored price.
+        current = self.repo.get_prices(list(fetch_map))
+        fetch_map = {
+            symbol: provider_symbol
+            for symbol, provider_symbol in fetch_map.items()
+            if (current.get(symbol) or {}).get("source") != "manual"
+        }
+        return self._store_provider_results(
+            fetch_map, current, provider_results, fetched_at
+        )
+
     # ------------------------------------------------------------------
     def set_manual(self, symbol: str, price, asof) -> dict[str, PriceQuote]:
         """Set a manual price entry that takes precedence over provider data."""
@@ -111,15 +189,84 @@ class PricingService:
             stale=False,
         )
         self._persist_record(record)
-        return {symbol: self._quote_from_record(record)}
+        return {symbol: self._quote_from_record(record, self._stale_cutoffs(now))}
+
+    # ------------------------------------------------------------------
+    def _refresh(
+        self, symbols: list[str], existing: Mapping[str, Mapping[str, object]]
+    ) -> dict[str, PriceQuote]:
+        fetch_map = self._build_provider_symbol_map(symbols, existing)
+        if not fetch_map:
+            return {}
+
+        try:
+            provider_results = self.provider.fetch(list(dict.fromkeys(fetch_map.values())))
+        except Exception:
+            _LOG.warning("Price refresh failed; serving cached quotes", exc_info=True)
+            return {}
+        return self._store_provider_results(
+            fetch_map, existing, provider_results, self._now()
+        )
+
+    def _store_provider_results(
+        self,
+        fetch_map: Mapping[str, str],
+        existing: Mapping[str, Mapping[str, object]],
+        provider_results: Mapping[str, ProviderPrice],
+        now: datetime,
+    ) -> dict[str, PriceQuote]:
+        quotes: dict[str, PriceQuote] = {}
+        rows: list[dict[str, object]] = []
+        cutoffs = self._stale_cutoffs(now)
+        for symbol, provider_symbol in fetch_map.items():
+            data = provider_results.get(provider_symbol)
+            if not data:
+                continue
+            record = self._record_from_provider(symbol, data, now, existing.get(symbol))
+            rows.append(self._price_row(record))
+            quotes[symbol] = self._quote_from_record(record, cutoffs)
+        if rows:
+            self.repo.upsert_prices(rows)
+        return quotes
+
+    def _submit_revalidation(
+        self, symbols: list[str], existing: Mapping[str, Mapping[str, object]]
+    ) -> None:
+        if self._revalidation is not None and not self._revalidation.done():
+            return
+        # Repository access stays on the caller's thread (SQLite connections are
+        # thread-bound); only the provider round-trip runs in the background.
+        fetch_map = self._build_provider_symbol_map(symbols, existing)
+        if not fetch_map:
+            return
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="price-revalidate"
+            )
+        self._revalidation = self._executor.submit(
+            self._fetch_in_background, fetch_map
+        )
+
+    def _fetch_in_background(
+        self, fetch_map: dict[str, str]
+    ) -> tuple[dict[str, str], dict[str, ProviderPrice], datetime]:
+        provider_results = self.provider.fetch(list(dict.fromkeys(fetch_map.values())))
+        return fetch_map, provider_results, self._now()
+
+    def _quote_from_row(
+        self,
+        symbol: str,
+        row: Mapping[str, object],
+        cutoffs: tuple[datetime, datetime, datetime],
+    ) -> PriceQuote:
+        return self._quote_from_record(self._record_from_row(symbol, row), cutoffs)
 
     # ------------------------------------------------------------------
     def _ensure_datetime(self, value) -> datetime:
         if isinstance(value, datetime):
             return value if value.tzinfo else value.replace(tzinfo=self.tz)
         if isinstance(value, str):
-            parsed = datetime.fromisoformat(value)
-            return parsed if parsed.tzinfo else parsed.replace(tzinfo=self.tz)
+            return parse_iso(value, self.tz.key)
         raise TypeError("Expected datetime or ISO8601 string")
 
     def _record_from_row(self, symbol: str, row: Mapping[str, object]) -> CachedRecord:
@@ -135,25 +282,43 @@ class PricingService:
             source=str(row["source"]),
             fetched_at=self._ensure_datetime(row["fetched_at"]),
             stale=stale_flag,
+            volatility=_optional_float(row.get("volatility_ewma")),
+            ttl_seconds=_optional_float(row.get("effective_ttl_seconds")),
         )
 
     def _persist_record(self, record: CachedRecord) -> None:
+        self.repo.upsert_price(self._price_row(record))
+
+    def _price_row(self, record: CachedRecord) -> dict[str, object]:
         stale_flag = int(record.fetched_at - record.asof > self.stale_window)
-        self.repo.upsert_price(
-            {
-                "symbol": record.symbol,
-                "asof": record.asof.isoformat(),
-                "price": record.price,
-                "source": record.source,
-                "fetched_at": record.fetched_at.isoformat(),
-                "stale": stale_flag,
-            }
-        )
+        return {
+            "symbol": record.symbol,
+            "asof": record.asof.isoformat(),
+            "price": record.price,
+            "source": record.source,
+            "fetched_at": record.fetched_at.isoformat(),
+            "stale": stale_flag,
+            "volatility_ewma": record.volatility,
+            "effective_ttl_seconds": record.ttl_seconds,
+        }
 
-    def _quote_from_record(self, record: CachedRecord) -> PriceQuote:
-        now = self._now()
-        stale = (now - record.fetched_at) > self.cache_ttl
-        stale = stale or (now - record.asof) > self.stale_window
+    def _stale_cutoffs(self, now: datetime) -> tuple[datetime, datetime, datetime]:
+        """Return ``(now, fetched_cutoff, asof_cutoff)`` for staleness checks.
+
+        Callers compute these once per batch of quotes and pass them down, so
+        each record is compared against ready-made datetimes.
+        """
+
+        return now, now - self.cache_ttl, now - self.stale_window
+
+    def _quote_from_record(
+        self, record: CachedRecord, cutoffs: tuple[datetime, datetime, datetime]
+    ) -> PriceQuote:
+        now, fetched_cutoff, asof_cutoff = cutoffs
+        if self.adaptive_ttl and record.ttl_seconds is not None:
+            fetched_cutoff = now - timedelta(seconds=record.ttl_seconds)
+        stale = record.stale or record.fetched_at < fetched_cutoff
+        stale = stale or record.asof < asof_cutoff
         return PriceQuote(
             symbol=record.symbol,
             asof=record.asof,
@@ -163,9 +328,14 @@ class PricingService:
         )
 
     def _record_from_provider(
-        self, symbol: str, data: ProviderPrice, now: datetime
+        self,
+        symbol: str,
+        data: ProviderPrice,
+        now: datetime,
+        previous: Mapping[str, object] | None = None,
     ) -> CachedRecord:
         asof = data.asof.astimezone(self.tz)
+        volatility = self._update_volatility(data.price, previous)
         return CachedRecord(
             symbol=symbol,
             asof=asof,
@@ -173,13 +343,46 @@ class PricingService:
             source=data.source,
             fetched_at=now,
             stale=False,
+            volatility=volatility,
+            ttl_seconds=self._effective_ttl_seconds(volatility),
         )
 
-    def _build_provider_symbol_map(self, symbols: Iterable[str]) -> dict[str, str]:
+    def _update_volatility(
+        self, price: float, previous: Mapping[str, object] | None
+    ) -> float | None:
+        """Exponentially weighted relative price change between refreshes."""
+
+        if not previous:
+            return None
+        old_price = _optional_float(previous.get("price"))
+        if not old_price or old_price <= 0:
+            return None
+        change = abs(price - old_price) / old_price
+        old_vol = _optional_float(previous.get("volatility_ewma"))
+        if old_vol is None:
+            return change
+        return _VOLATILITY_DECAY * old_vol + (1 - _VOLATILITY_DECAY) * change
+
+    def _effective_ttl_seconds(self, volatility: float | None) -> float | None:
+        """Scale the base TTL so quiet symbols are refetched less often."""
+
+        if volatility is None:
+            return None
+        base = self.cache_ttl.total_seconds()
+        if volatility <= 0:
+            return _MAX_TTL_SECONDS
+        ttl = base * (self.target_volatility / volatility)
+        return min(max(ttl, _MIN_TTL_SECONDS), _MAX_TTL_SECONDS)
+
+    def _build_provider_symbol_map(
+        self,
+        symbols: list[str],
+        existing: Mapping[str, Mapping[str, object]],
+    ) -> dict[str, str]:
         mapping: dict[str, str] = {}
         if not symbols:
             return mapping
-        existing = self.repo.get_prices(symbols)
+        self._prefetch_exchanges(symbols)
         for symbol in symbols:
             existing_record = existing.get(symbol)
             if existing_record and existing_record.get("source") == "manual":
@@ -189,21 +392,41 @@ class PricingService:
         return mapping
 
     def _provider_symbol_for(self, symbol: str) -> str:
+        provider_symbol = self._provider_symbol_cache.get(symbol)
+        if provider_symbol is not None:
+            return provider_symbol
+        # Exchanges are cached upper-cased, matching the suffix map's keys.
         exchange = self._exchange_for_symbol(symbol)
-        suffix = self.exchange_suffix_map.get(exchange.upper()) if exchange else None
+        suffix = self.exchange_suffix_map.get(exchange) if exchange else None
+        provider_symbol = symbol
         if suffix and not symbol.endswith(suffix):
-            return f"{symbol}{suffix}"
-        return symbol
+            provider_symbol = f"{symbol}{suffix}"
+        self._provider_symbol_cache[symbol] = provider_symbol
+        return provider_symbol
+
+    def _prefetch_exchanges(self, symbols: Iterable[str]) -> None:
+        missing = [symbol for symbol in symbols if symbol not in self._exchange_cache]
+        if not missing:
+            return
+        latest = self.repo.get_latest_exchanges(missing)
+        for symbol in missing:
+            exchange = latest.get(symbol)
+            self._exchange_cache[symbol] = exchange.upper() if isinstance(exchange, str) else None
 
     def _exchange_for_symbol(self, symbol: str) -> str | None:
         if symbol in self._exchange_cache:
             return self._exchange_cache[symbol]
-        rows = self.repo.list_transactions(symbol=symbol, limit=1, order="desc")
-        exchange = None
-        if rows:
-            exchange = rows[0].get("exchange")
-        self._exchange_cache[symbol] = exchange.upper() if isinstance(exchange, str) else None
+        self._prefetch_exchanges([symbol])
         return self._exchange_cache[symbol]
 
 
+def _optional_float(value: object) -> float | None:
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)  # type: ignore[arg-type]
+    except (TypeError, ValueError):
+        return None
+
+
 __all__ = ["PricingService", "CachedRecord"]
@@ -1,14 +1,19 @@
 """Reporting helpers for portfolio snapshots and ledgers."""
 from __future__ import annotations
 
-from datetime import date, datetime
-from typing import Mapping, Sequence
+from datetime import date, datetime, timedelta
+from itertools import islice
+from operator import itemgetter
+from typing import Hashable, Iterator, Mapping, Sequence
 
 from zoneinfo import ZoneInfo
 
 from ..data.repo_base import BaseRepository
 from .models import Lot, Position, PriceQuote
 from .services import PortfolioService
+from .timeutil import parse_iso
+
+_AUDIT_PAGE_SIZE = 1000
 
 
 def _ensure_dt(value: datetime | date | None, tz: ZoneInfo) -> datetime:
@@ -19,11 +24,19 @@ def _ensure_dt(value: datetime | date | None, tz: ZoneInfo) -> datetime:
     return datetime(value.year, value.month, value.day, tzinfo=tz)
 
 
+def _prices_fingerprint(prices: Mapping[str, PriceQuote | float]) -> frozenset:
+    return frozenset(
+        (symbol, quote.price, quote.asof, quote.source, quote.stale)
+        if isinstance(quote, PriceQuote)
+        else (symbol, quote)
+        for symbol, quote in prices.items()
+    )
+
+
 def _parse_dt(value: str | None, tz: ZoneInfo) -> datetime | None:
     if value is None:
         return None
-    dt = datetime.fromisoformat(value)
-    return dt if dt.tzinfo else dt.replace(tzinfo=tz)
+    return parse_iso(value, tz.key)
 
 
 class ReportingService:
@@ -44,6 +57,7 @@ class ReportingService:
             repo,
             timezone=timezone,
         )
+        self._snapshot_cache: tuple[Hashable, list[dict[str, object]]] | None = None
 
     # ------------------------------------------------------------------
     def positions_snapshot(
@@ -53,14 +67,38 @@ class ReportingService:
     ) -> list[dict[str, object]]:
         asof_dt = _ensure_dt(asof, self.tz)
         prices = prices or {}
+        # Rows depend only on stored lots and the quotes passed in, so repeat
+        # calls (UI refreshes, rule ticks) reuse them and restamp report_asof.
+        version = self.repo.data_version()
+        cache_key = (version, _prices_fingerprint(prices)) if version is not None else None
+        cached = self._snapshot_cache
+        if cache_key is not None and cached is not None and cached[0] == cache_key:
+            return [{**row, "report_asof": asof_dt} for row in cached[1]]
+        rows = self._build_positions_snapshot(asof_dt, prices)
+        if cache_key is not None:
+            self._snapshot_cache = (cache_key, [dict(row) for row in rows])
+        return rows
+
+    def _build_positions_snapshot(
+        self,
+        asof_dt: datetime,
+        prices: Mapping[str, PriceQuote],
+    ) -> list[dict[str, object]]:
         positions: Sequence[Position] = self.portfolio.compute_positions(prices=prices)
         rows: list[dict[str, object]] = []
         total_mv = 0.0
         total_cost = 0.0
+        total_qty = 0.0
         for position in positions:
             cost_base = position.avg_cost * position.total_qty
             total_cost += cost_base
+            total_qty += position.total_qty
             quote = prices.get(position.symbol)
+            if isinstance(quote, PriceQuote):
+                price, price_source = quote.price, quote.source
+                price_asof, price_stale = quote.asof, quote.stale
+            else:
+                price = price_source = price_asof = price_stale = None
             row = {
                 "report_asof": asof_dt,
                 "base_currency": self.base_currency,
@@ -68,10 +106,10 @@ class ReportingService:
                 "quantity": position.total_qty,
                 "avg_cost": position.avg_cost,
                 "cost_base": cost_base,
-                "price": quote.price if isinstance(quote, PriceQuote) else None,
-                "price_source": quote.source if isinstance(quote, PriceQuote) else None,
-                "price_asof": quote.asof if isinstance(quote, PriceQuote) else None,
-                "price_stale": quote.stale if isinstance(quote, PriceQuote) else None,
+                "price": price,
+                "price_source": price_source,
+                "price_asof": price_asof,
+                "price_stale": price_stale,
                 "market_value": position.mv,
                 "weight_pct": (position.weight or 0.0) * 100 if position.weight is not None else None,
             }
@@ -79,13 +117,14 @@ class ReportingService:
                 total_mv += position.mv
             rows.append(row)
         if rows:
-            rows.sort(key=lambda item: item["symbol"])
+            if len(rows) > 1:
+                rows.sort(key=itemgetter("symbol"))
             rows.append(
                 {
                     "report_asof": asof_dt,
                     "base_currency": self.base_currency,
                     "symbol": "TOTAL",
-                    "quantity": sum(r["quantity"] for r in rows if isinstance(r.get("quantity"), (int, float))),
+                    "quantity": total_qty,
                     "avg_cost": None,
                     "cost_base": total_cost,
                     "price": None,
@@ -100,13 +139,20 @@ class ReportingService:
 
     # ------------------------------------------------------------------
     def lots_ledger(self, symbol: str | None = None) -> list[dict[str, object]]:
-        lots = self.repo.list_lots(symbol=symbol)
+        lots = [self._lot_from_row(row) for row in self.repo.list_lots(symbol=symbol)]
+        source_txns = self.repo.get_transactions(
+            lot.source_txn_id for lot in lots if lot.source_txn_id
+        )
+        disposals_by_lot: dict[int, list[dict[str, object]]] = {}
+        for disposal in self.repo.list_disposals(
+            lot_ids=[lot.lot_id for lot in lots if lot.lot_id]
+        ):
+            disposals_by_lot.setdefault(disposal["lot_id"], []).append(disposal)
         rows: list[dict[str, object]] = []
-        for lot_row in lots:
-            lot = self._lot_from_row(lot_row)
-            txn = self.repo.get_transaction(lot.source_txn_id) if lot.source_txn_id else None
+        for lot in lots:
+            txn = source_txns.get(lot.source_txn_id) if lot.source_txn_id else None
             original_qty = float(txn["qty"]) if txn else lot.qty_remaining
-            disposals = self.repo.list_disposals(lot_id=lot.lot_id) if lot.lot_id else []
+            disposals = disposals_by_lot.get(lot.lot_id, []) if lot.lot_id else []
             disposed_qty = sum(float(d["qty"]) for d in disposals)
             disposed_cost = sum(float(d["cost_base_alloc"]) for d in disposals)
             rows.append(
@@ -124,7 +170,7 @@ class ReportingService:
                     "source_txn_id": lot.source_txn_id,
                 }
             )
-        rows.sort(key=lambda item: (item["symbol"], item["acquired_at"]))
+        rows.sort(key=itemgetter("symbol", "acquired_at"))
         return rows
 
     # ------------------------------------------------------------------
@@ -135,47 +181,55 @@ class ReportingService:
         window_days: int,
     ) -> list[dict[str, object]]:
         asof_dt = _ensure_dt(asof, self.tz)
+        asof_ordinal = asof_dt.toordinal()
+        horizon = asof_dt.date() + timedelta(days=window_days)
         rows: list[dict[str, object]] = []
-        for lot_row in self.repo.list_lots(only_open=True):
-            threshold_raw = lot_row.get("threshold_date")
-            if not threshold_raw:
-                continue
-            threshold_dt = _parse_dt(threshold_raw, self.tz)
-            if threshold_dt is None:
-                continue
-            delta_days = (threshold_dt.date() - asof_dt.date()).days
+        for lot_row in self.repo.list_lots(only_open=True, threshold_until=horizon):
+            threshold_dt = _parse_dt(lot_row["threshold_date"], self.tz)
+            delta_days = threshold_dt.toordinal() - asof_ordinal
             eligible = delta_days <= 0
-            if delta_days <= window_days:
-                rows.append(
-                    {
-                        "report_asof": asof_dt,
-                        "window_days": window_days,
-                        "symbol": lot_row["symbol"],
-                        "lot_id": lot_row.get("lot_id"),
-                        "acquired_at": _parse_dt(lot_row.get("acquired_at"), self.tz),
-                        "threshold_date": threshold_dt,
-                        "days_until": delta_days,
-                        "eligible_for_discount": eligible,
-                        "qty_remaining": lot_row.get("qty_remaining"),
-                    }
-                )
-        rows.sort(key=lambda item: (item["threshold_date"], item["symbol"]))
+            rows.append(
+                {
+                    "report_asof": asof_dt,
+                    "window_days": window_days,
+                    "symbol": lot_row["symbol"],
+                    "lot_id": lot_row.get("lot_id"),
+                    "acquired_at": _parse_dt(lot_row.get("acquired_at"), self.tz),
+                    "threshold_date": threshold_dt,
+                    "days_until": delta_days,
+                    "eligible_for_discount": eligible,
+                    "qty_remaining": lot_row.get("qty_remaining"),
+                }
+            )
+        rows.sort(key=itemgetter("threshold_date", "symbol"))
         return rows
 
     # ------------------------------------------------------------------
     def trade_audit_log(self) -> list[dict[str, object]]:
-        rows: list[dict[str, object]] = []
-        for txn in self.repo.list_transactions():
-            disposals = (
-                self.repo.list_disposals(sell_txn_id=txn["id"])
-                if txn["type"] == "SELL"
-                else []
+        # The repository already yields transactions in (dt, id) order.
+        return list(self.iter_trade_audit_log())
+
+    # ------------------------------------------------------------------
+    def iter_trade_audit_log(
+        self, *, page_size: int = _AUDIT_PAGE_SIZE
+    ) -> Iterator[dict[str, object]]:
+        """Yield audit rows in repository order without building the full list.
+
+        Transactions are streamed from the repository and SELL disposal
+        totals are fetched once per page, so at most ``page_size`` rows are
+        held at a time.
+        """
+
+        transactions = self.repo.iter_transactions(batch_size=page_size)
+        while page := list(islice(transactions, page_size)):
+            totals_by_sell = self._sell_totals(
+                [txn["id"] for txn in page if txn["type"] == "SELL"]
             )
-            proceeds = float(txn["qty"]) * float(txn["price"]) - float(txn.get("fees", 0.0))
-            cost_base = sum(float(d["cost_base_alloc"]) for d in disposals)
-            gain = sum(float(d["gain_loss"]) for d in disposals)
-            rows.append(
-                {
+            for txn in page:
+                totals = totals_by_sell.get(txn["id"]) if txn["type"] == "SELL" else None
+                cost_base, gain = totals if totals is not None else (None, None)
+                proceeds = float(txn["qty"]) * float(txn["price"]) - float(txn.get("fees", 0.0))
+                yield {
                     "txn_id": txn["id"],
                     "dt": datetime.fromisoformat(txn["dt"]),
                     "type": txn["type"],
@@ -184,14 +238,26 @@ class ReportingService:
                     "price": float(txn["price"]),
                     "fees": float(txn.get("fees", 0.0)),
                     "proceeds": proceeds,
-                    "cost_base": cost_base if disposals else None,
-                    "gain_loss": gain if disposals else None,
+                    "cost_base": cost_base,
+                    "gain_loss": gain,
                     "broker_ref": txn.get("broker_ref"),
                     "notes": txn.get("notes"),
                 }
+
+    def _sell_totals(self, sell_ids: list[int]) -> dict[int, tuple[float, float]]:
+        """Return ``(cost_base, gain_loss)`` summed over each sell's disposals."""
+
+        totals: dict[int, tuple[float, float]] = {}
+        if not sell_ids:
+            return totals
+        for disposal in self.repo.list_disposals(sell_txn_ids=sell_ids):
+            sell_id = disposal["sell_txn_id"]
+            cost, gain = totals.get(sell_id, (0.0, 0.0))
+            totals[sell_id] = (
+                cost + float(disposal["cost_base_alloc"]),
+                gain + float(disposal["gain_loss"]),
             )
-        rows.sort(key=lambda item: (item["dt"], item["txn_id"]))
-        return rows
+        return totals
 
     # ------------------------------------------------------------------
     def _lot_from_row(self, row: Mapping[str, object]) -> Lot:
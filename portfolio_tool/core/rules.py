@@ -3,6 +3,7 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from datetime import datetime, timedelta
+from types import MappingProxyType
 from typing import Callable, Iterable, Mapping, Sequence
 
 from zoneinfo import ZoneInfo
@@ -11,6 +12,7 @@ from ..data.repo_base import BaseRepository
 from .models import Actionable, PriceQuote
 from .reports import ReportingService
 from .services import PortfolioService
+from .timeutil import parse_iso
 
 
 @dataclass(slots=True)
@@ -77,14 +79,16 @@ class ActionableService:
         """Run configured rules and update persisted actionables."""
 
         asof = self._now()
-        symbols = self._open_symbols()
-        quotes = self.pricing.get_cached(symbols)
+        lot_rows = self.repo.list_lots(only_open=True)
+        symbols = sorted({row["symbol"] for row in lot_rows})
+        # One read-only quote map feeds the snapshot and every rule.
+        quotes = MappingProxyType(self.pricing.get_cached(symbols))
         positions = [
             row
             for row in self.reporting.positions_snapshot(asof, quotes)
             if row.get("symbol") != "TOTAL"
         ]
-        lots = self._load_lots()
+        lots = [self._decorate_lot(row) for row in lot_rows]
         transactions = self._load_transactions(symbols)
         context = RuleContext(
             asof=asof,
@@ -96,58 +100,64 @@ class ActionableService:
             thresholds=self.thresholds,
             timezone=self.tz,
         )
-        candidates: dict[str, ActionableCandidate] = {}
+        candidates: dict[tuple[str, str, str], ActionableCandidate] = {}
         for rule in self.rules:
             for candidate in rule(context):
                 key = self._candidate_key(candidate)
                 candidates[key] = candidate
 
-        existing = {
-            self._candidate_key(self._actionable_from_row(row)): row
-            for row in self.repo.list_actionables(include_snoozed=True)
-        }
-
-        updated_ids: set[int] = set()
-        for key, candidate in candidates.items():
-            row = existing.get(key)
-            if row:
-                actionable = self._actionable_from_row(row)
-                status = actionable.status
-                snoozed_until = actionable.snoozed_until
-                if status == "SNOOZE" and snoozed_until and snoozed_until > asof:
-                    new_status = "SNOOZE"
-                else:
-                    new_status = "OPEN"
-                    snoozed_until = None
-                updates = {
-                    "message": candidate.message,
-                    "symbol": candidate.symbol,
-                    "context": candidate.context,
-                    "status": new_status,
-                    "updated_at": asof.isoformat(),
-                    "snoozed_until": snoozed_until.isoformat() if snoozed_until else None,
-                }
-                self.repo.update_actionable(actionable.id, updates)
-                updated_ids.add(actionable.id)
-            else:
-                payload = {
-                    "type": candidate.type,
-                    "symbol": candidate.symbol,
-                    "message": candidate.message,
-                    "status": "OPEN",
-                    "created_at": asof.isoformat(),
-                    "updated_at": asof.isoformat(),
-                    "snoozed_until": None,
-                    "context": candidate.context,
-                }
-                actionable_id = self.repo.add_actionable(payload)
-                updated_ids.add(actionable_id)
-
-        for row in existing.values():
+        # Parse each persisted row once; both the update and the close-out
+        # passes below work from the same Actionable instances.
+        existing: dict[tuple[str, str, str], Actionable] = {}
+        for row in self.repo.list_actionables(include_snoozed=True):
             actionable = self._actionable_from_row(row)
-            if actionable.id not in updated_ids and actionable.status == "OPEN":
-                self.repo.update_actionable(
-                    actionable.id,
+            existing[self._candidate_key(actionable)] = actionable
+
+        # All writes for this evaluation share one transaction / file flush.
+        with self.repo.batch():
+            updated_ids: set[int] = set()
+            for key, candidate in candidates.items():
+                actionable = existing.get(key)
+                if actionable is not None:
+                    status = actionable.status
+                    snoozed_until = actionable.snoozed_until
+                    if status == "SNOOZE" and snoozed_until and snoozed_until > asof:
+                        new_status = "SNOOZE"
+                    else:
+                        new_status = "OPEN"
+                        snoozed_until = None
+                    updates = {
+                        "message": candidate.message,
+                        "symbol": candidate.symbol,
+                        "context": candidate.context,
+                        "status": new_status,
+                        "updated_at": asof.isoformat(),
+                        "snoozed_until": snoozed_until.isoformat() if snoozed_until else None,
+                    }
+                    self.repo.update_actionable(actionable.id, updates)
+                    updated_ids.add(actionable.id)
+                else:
+                    payload = {
+                        "type": candidate.type,
+                        "symbol": candidate.symbol,
+                        "message": candidate.message,
+                        "status": "OPEN",
+                        "created_at": asof.isoformat(),
+                        "updated_at": asof.isoformat(),
+                        "snoozed_until": None,
+                        "context": candidate.context,
+                    }
+                    actionable_id = self.repo.add_actionable(payload)
+                    updated_ids.add(actionable_id)
+
+            stale_ids = [
+                actionable.id
+                for actionable in existing.values()
+                if actionable.id not in updated_ids and actionable.status == "OPEN"
+            ]
+            if stale_ids:
+                self.repo.update_actionables(
+                    stale_ids,
                     {
                         "status": "DONE",
                         "updated_at": asof.isoformat(),
@@ -192,39 +202,29 @@ class ActionableService:
         )
 
     # ------------------------------------------------------------------
-    def _candidate_key(self, candidate: ActionableCandidate | Actionable) -> str:
-        symbol = (candidate.symbol or "").upper()
-        context = candidate.context or ""
-        return f"{candidate.type}|{symbol}|{context}"
+    def _candidate_key(
+        self, candidate: ActionableCandidate | Actionable
+    ) -> tuple[str, str, str]:
+        return (candidate.type, (candidate.symbol or "").upper(), candidate.context or "")
 
     # ------------------------------------------------------------------
-    def _open_symbols(self) -> list[str]:
-        rows = self.repo.list_lots(only_open=True)
-        return sorted({row["symbol"] for row in rows})
-
-    # ------------------------------------------------------------------
-    def _load_lots(self) -> list[dict[str, object]]:
-        rows = self.repo.list_lots(only_open=True)
-        result: list[dict[str, object]] = []
-        for row in rows:
-            result.append(
-                {
-                    **row,
-                    "acquired_at": self._parse_dt(row.get("acquired_at")),
-                    "threshold_date": self._parse_dt(row.get("threshold_date")),
-                    "qty_remaining": float(row.get("qty_remaining", 0.0)),
-                }
-            )
-        return result
+    def _decorate_lot(self, row: Mapping[str, object]) -> dict[str, object]:
+        return {
+            **row,
+            "acquired_at": self._parse_dt(row.get("acquired_at")),
+            "threshold_date": self._parse_dt(row.get("threshold_date")),
+            "qty_remaining": float(row.get("qty_remaining", 0.0)),
+        }
 
     # ------------------------------------------------------------------
     def _load_transactions(
         self, symbols: Sequence[str]
     ) -> dict[str, Sequence[dict[str, object]]]:
-        mapping: dict[str, Sequence[dict[str, object]]] = {}
-        for symbol in symbols:
-            rows = self.repo.list_transactions(symbol=symbol)
-            mapping[symbol] = rows
+        mapping: dict[str, list[dict[str, object]]] = {symbol: [] for symbol in symbols}
+        if not mapping:
+            return mapping
+        for row in self.repo.list_transactions(symbols=mapping):
+            mapping[row["symbol"]].append(row)
         return mapping
 
     # ------------------------------------------------------------------
@@ -243,13 +243,18 @@ class ActionableService:
 
     # ------------------------------------------------------------------
     def _parse_dt(self, value: object) -> datetime | None:
+        # Exact-type checks first: repository rows carry ISO strings, so the
+        # common cases resolve without walking the isinstance MRO.
+        if value.__class__ is str and value:
+            return parse_iso(value, self.tz.key)
+        if value.__class__ is datetime:
+            return value if value.tzinfo is not None else value.replace(tzinfo=self.tz)
         if not value:
             return None
         if isinstance(value, datetime):
             return value if value.tzinfo else value.replace(tzinfo=self.tz)
         if isinstance(value, str):
-            dt = datetime.fromisoformat(value)
-            return dt if dt.tzinfo else dt.replace(tzinfo=self.tz)
+            return parse_iso(value, self.tz.key)
         raise TypeError(f"Unsupported datetime value: {value!r}")
 
 
@@ -2,6 +2,8 @@
 from __future__ import annotations
 
 from datetime import datetime
+from operator import attrgetter
+from typing import Iterable
 
 from zoneinfo import ZoneInfo
 
@@ -9,6 +11,7 @@ from ..data.repo_base import BaseRepository
 from .cgt import CGTEngine, cgt_threshold
 from .lots import LotEngine, LotMatchingError
 from .models import Lot, Position, PriceQuote, Transaction
+from .timeutil import parse_iso
 
 
 class PortfolioService:
@@ -24,9 +27,13 @@ class PortfolioService:
     ) -> None:
         self.repo = repo
         self.timezone = timezone
+        self._tz = ZoneInfo(timezone)
         self.lot_engine = LotEngine(lot_matching)
         self.cgt_engine = CGTEngine(timezone)
         self.brokerage_allocation = brokerage_allocation.upper()
+        self._fees_on_buy = self.brokerage_allocation in {"BUY", "SPLIT"}
+        self._fees_on_sell = self.brokerage_allocation in {"SELL", "SPLIT"}
+        self._aggregates_cache: tuple[object, dict[str, tuple[float, float]]] | None = None
 
     # ------------------------------------------------------------------
     def record_trade(
@@ -37,7 +44,61 @@ class PortfolioService:
     ) -> int:
         """Persist a transaction and update lot/disposal state."""
 
-        txn_dict = {
+        # One batch per trade: the transaction row, lot updates and disposals
+        # commit together (and SQLite rolls all of them back if matching fails).
+        with self.repo.batch():
+            txn_id = self.repo.add_transaction(self._txn_row(txn))
+            txn.id = txn_id
+
+            if txn.type == "BUY" or txn.type == "DRP":
+                self._record_buy(txn)
+            elif txn.type == "SELL":
+                self._record_sell(txn, specific_lots=specific_lots)
+            else:
+                raise ValueError(f"Unsupported transaction type: {txn.type}")
+        return txn_id
+
+    # ------------------------------------------------------------------
+    def record_trades(self, txns: Iterable[Transaction]) -> list[int]:
+        """Persist several trades in order as one unit; return their ids.
+
+        Intended for imports: everything is written in a single repository
+        batch, so SQLite commits once and keeps none of the trades if any of
+        them fails, and the JSON log is flushed once. Open lots are tracked in
+        memory per symbol, so sells do not re-query the repository.
+        """
+
+        txn_ids: list[int] = []
+        open_lots: dict[str, list[Lot]] = {}
+        with self.repo.batch():
+            for txn in txns:
+                txn.id = self.repo.add_transaction(self._txn_row(txn))
+                if txn.type == "BUY" or txn.type == "DRP":
+                    lot = self._record_buy(txn)
+                    # Only track symbols already loaded; a later sell of an
+                    # untracked symbol reads this lot back with the others.
+                    if txn.symbol in open_lots:
+                        open_lots[txn.symbol].append(lot)
+                elif txn.type == "SELL":
+                    symbol_lots = open_lots.get(txn.symbol)
+                    if symbol_lots is None:
+                        symbol_lots = [
+                            self._lot_from_row(row)
+                            for row in self.repo.list_lots(symbol=txn.symbol, only_open=True)
+                        ]
+                    self._record_sell(txn, specific_lots=None, open_lots=symbol_lots)
+                    open_lots[txn.symbol] = [
+                        lot for lot in symbol_lots if lot.qty_remaining > 0
+                    ]
+                else:
+                    raise ValueError(f"Unsupported transaction type: {txn.type}")
+                txn_ids.append(txn.id)
+        return txn_ids
+
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _txn_row(txn: Transaction) -> dict[str, object]:
+        return {
             "dt": txn.dt.isoformat(),
             "type": txn.type,
             "symbol": txn.symbol,
@@ -48,23 +109,13 @@ class PortfolioService:
             "notes": txn.notes,
             "exchange": txn.exchange,
         }
-        txn_id = self.repo.add_transaction(txn_dict)
-        txn.id = txn_id
-
-        if txn.type == "BUY" or txn.type == "DRP":
-            self._record_buy(txn)
-        elif txn.type == "SELL":
-            self._record_sell(txn, specific_lots=specific_lots)
-        else:
-            raise ValueError(f"Unsupported transaction type: {txn.type}")
-        return txn_id
 
     # ------------------------------------------------------------------
-    def _record_buy(self, txn: Transaction) -> None:
-        tzinfo = ZoneInfo(self.timezone)
-        threshold = cgt_threshold(txn.dt, self.timezone)
+    def _record_buy(self, txn: Transaction) -> Lot:
+        tzinfo = self._tz
+        threshold = cgt_threshold(txn.dt, tzinfo)
         base_cost = txn.qty * txn.price
-        if self.brokerage_allocation in {"BUY", "SPLIT"}:
+        if self._fees_on_buy:
             base_cost += txn.fees
         lot = Lot(
             lot_id=None,
@@ -85,6 +136,7 @@ class PortfolioService:
         }
         lot_id = self.repo.add_lot(lot_record)
         lot.lot_id = lot_id
+        return lot
 
     # ------------------------------------------------------------------
     def _record_sell(
@@ -92,46 +144,62 @@ class PortfolioService:
         txn: Transaction,
         *,
         specific_lots: dict[int, float] | None,
+        open_lots: list[Lot] | None = None,
     ) -> None:
-        open_lots = [
-            self._lot_from_row(row)
-            for row in self.repo.list_lots(symbol=txn.symbol, only_open=True)
-        ]
+        """Match and persist a sell.
+
+        ``open_lots`` lets a caller that already tracks the symbol's open lots
+        (``rebuild_state``) skip the repository read; the lots are updated in
+        place either way.
+        """
+
+        if open_lots is None:
+            open_lots = [
+                self._lot_from_row(row)
+                for row in self.repo.list_lots(symbol=txn.symbol, only_open=True)
+            ]
         try:
             matches = self.lot_engine.match(open_lots, txn.qty, specific_lots)
         except LotMatchingError as exc:
             raise ValueError(str(exc)) from exc
 
-        sell_fee = txn.fees if self.brokerage_allocation in {"SELL", "SPLIT"} else 0.0
+        sell_fee = txn.fees if self._fees_on_sell else 0.0
         slices = self.cgt_engine.slice_disposal(txn, matches, sell_fee)
 
-        for (lot, qty), disposal in zip(matches, slices):
-            if lot.lot_id is None:
-                continue
-            remaining_qty = lot.qty_remaining - qty
-            remaining_cost = lot.cost_base_total - disposal.cost_base_alloc
-            if remaining_qty < 0:
-                remaining_qty = 0
-            if remaining_cost < 0 and remaining_cost > -1e-9:
-                remaining_cost = 0.0
-            self.repo.update_lot(
-                lot.lot_id,
-                {
-                    "qty_remaining": remaining_qty,
-                    "cost_base_total": remaining_cost,
-                },
-            )
-            self.repo.add_disposal(
-                {
-                    "sell_txn_id": txn.id,
-                    "lot_id": lot.lot_id,
-                    "qty": disposal.qty,
-                    "proceeds": disposal.proceeds,
-                    "cost_base_alloc": disposal.cost_base_alloc,
-                    "gain_loss": disposal.gain_loss,
-                    "eligible_for_discount": int(disposal.eligible_for_discount),
-                }
-            )
+        disposal_rows: list[dict[str, object]] = []
+        with self.repo.batch():
+            for (lot, qty), disposal in zip(matches, slices):
+                if lot.lot_id is None:
+                    continue
+                remaining_qty = lot.qty_remaining - qty
+                remaining_cost = lot.cost_base_total - disposal.cost_base_alloc
+                if remaining_qty < 0:
+                    remaining_qty = 0
+                if remaining_cost < 0 and remaining_cost > -1e-9:
+                    remaining_cost = 0.0
+                self.repo.update_lot(
+                    lot.lot_id,
+                    {
+                        "qty_remaining": remaining_qty,
+                        "cost_base_total": remaining_cost,
+                    },
+                )
+                # Keep the in-memory lot authoritative so callers holding it do
+                # not need to re-read the row after the batch is flushed.
+                lot.qty_remaining = remaining_qty
+                lot.cost_base_total = remaining_cost
+                disposal_rows.append(
+                    {
+                        "sell_txn_id": txn.id,
+                        "lot_id": lot.lot_id,
+                        "qty": disposal.qty,
+                        "proceeds": disposal.proceeds,
+                        "cost_base_alloc": disposal.cost_base_alloc,
+                        "gain_loss": disposal.gain_loss,
+                        "eligible_for_discount": int(disposal.eligible_for_discount),
+                    }
+                )
+            self.repo.add_disposals(disposal_rows)
 
     # ------------------------------------------------------------------
     def compute_positions(
@@ -140,44 +208,24 @@ class PortfolioService:
         asof: datetime | None = None,
         prices: dict[str, PriceQuote | float] | None = None,
     ) -> list[Position]:
-        aggregates_rows = []
-        if hasattr(self.repo, "aggregate_open_lots"):
-            aggregates_rows = self.repo.aggregate_open_lots()
-
-        aggregates: dict[str, tuple[float, float]] = {}
-        if aggregates_rows:
-            for row in aggregates_rows:
-                symbol = row["symbol"]
-                qty = float(row.get("total_qty", 0.0) or 0.0)
-                cost = float(row.get("total_cost", 0.0) or 0.0)
-                aggregates[symbol] = (qty, cost)
-        else:
-            lots = [self._lot_from_row(row) for row in self.repo.list_lots(only_open=True)]
-            for lot in lots:
-                qty, cost = aggregates.get(lot.symbol, (0.0, 0.0))
-                aggregates[lot.symbol] = (
-                    qty + lot.qty_remaining,
-                    cost + lot.cost_base_total,
-                )
-
-        price_lookup: dict[str, float | None] = {}
-        if prices:
-            for symbol, quote in prices.items():
-                if isinstance(quote, PriceQuote):
-                    price_lookup[symbol] = quote.price
-                else:
-                    price_lookup[symbol] = float(quote)
-
+        aggregates = self._open_aggregates()
+        prices = prices or {}
         positions: list[Position] = []
         total_mv = 0.0
-        mv_by_symbol: dict[str, float] = {}
         for symbol, (qty, cost) in aggregates.items():
             avg_cost = cost / qty if qty else 0.0
-            price = price_lookup.get(symbol)
+            # Look quotes up per held symbol rather than copying the whole map;
+            # callers routinely pass quotes for more symbols than are held.
+            quote = prices.get(symbol)
+            if quote is None:
+                price = None
+            elif isinstance(quote, PriceQuote):
+                price = quote.price
+            else:
+                price = float(quote)
             mv = price * qty if price is not None else None
             if mv is not None:
                 total_mv += mv
-                mv_by_symbol[symbol] = mv
             positions.append(
                 Position(
                     symbol=symbol,
@@ -190,82 +238,111 @@ class PortfolioService:
 
         if total_mv > 0:
             for position in positions:
-                mv = mv_by_symbol.get(position.symbol)
-                position.weight = (mv / total_mv) if mv is not None else None
+                if position.mv is not None:
+                    position.weight = position.mv / total_mv
 
-        positions.sort(key=lambda pos: pos.symbol)
+        positions.sort(key=attrgetter("symbol"))
         return positions
 
+    # ------------------------------------------------------------------
+    def open_symbols(self) -> list[str]:
+        """Return the symbols that currently have open lots, sorted."""
+
+        return sorted(self._open_aggregates())
+
+    # ------------------------------------------------------------------
+    def _open_aggregates(self) -> dict[str, tuple[float, float]]:
+        """Return ``{symbol: (qty, cost)}`` for open lots.
+
+        Callers typically need the held symbols (to fetch quotes) and then the
+        positions themselves; memoising on the repository data version lets
+        both share one aggregate query.
+        """
+
+        version = self.repo.data_version()
+        cached = self._aggregates_cache
+        if version is not None and cached is not None and cached[0] == version:
+            return cached[1]
+
+        aggregates: dict[str, tuple[float, float]] = {}
+        if hasattr(self.repo, "aggregate_open_lots"):
+            # The repository sums per symbol (GROUP BY in SQLite), so an empty
+            # result means there are no open lots; no need to rescan them.
+            for row in self.repo.aggregate_open_lots():
+                qty = float(row.get("total_qty", 0.0) or 0.0)
+                cost = float(row.get("total_cost", 0.0) or 0.0)
+                aggregates[row["symbol"]] = (qty, cost)
+        else:
+            # Only the two numeric columns are needed, so sum straight from the
+            # rows rather than materialising timezone-aware Lot objects.
+            for row in self.repo.list_lots(only_open=True):
+                symbol = row["symbol"]
+                qty, cost = aggregates.get(symbol, (0.0, 0.0))
+                aggregates[symbol] = (
+                    qty + float(row["qty_remaining"]),
+                    cost + float(row["cost_base_total"]),
+                )
+        if version is not None:
+            self._aggregates_cache = (version, aggregates)
+        return aggregates
+
     # ------------------------------------------------------------------
     def rebuild_state(self) -> None:
         """Recompute lot and disposal state from persisted transactions."""
 
-        tzinfo = ZoneInfo(self.timezone)
-        transactions = self.repo.list_transactions(order="asc")
-        if not transactions:
-            for lot in list(self.repo.list_lots()):
-                lot_id = lot.get("lot_id")
-                if lot_id is not None:
-                    self.repo.delete_lot(int(lot_id))
-            return
-
+        tzinfo = self._tz
+        # Keyed by sell id, so disposals whose sell no longer exists are never
+        # looked up during the replay.
         specific_maps: dict[int, dict[int, float]] = {}
-        for row in transactions:
-            if str(row.get("type")).upper() != "SELL":
+        for disp in self.repo.list_disposals():
+            lot_id = disp.get("lot_id")
+            qty = disp.get("qty")
+            if lot_id is None or qty is None:
                 continue
-            sell_id = int(row["id"])
-            disposals = self.repo.list_disposals(sell_txn_id=sell_id)
-            if not disposals:
-                continue
-            mapping: dict[int, float] = {}
-            for disp in disposals:
-                lot_id = disp.get("lot_id")
-                qty = disp.get("qty")
-                if lot_id is None or qty is None:
-                    continue
-                mapping[int(lot_id)] = float(qty)
-            if mapping:
-                specific_maps[sell_id] = mapping
-
-        for row in list(self.repo.list_lots()):
-            lot_id = row.get("lot_id")
-            if lot_id is not None:
-                self.repo.delete_lot(int(lot_id))
-        for row in transactions:
-            if str(row.get("type")).upper() == "SELL":
-                self.repo.delete_disposals_for_sell(int(row["id"]))
-
-        for row in transactions:
-            txn = Transaction(
-                id=int(row["id"]),
-                dt=datetime.fromisoformat(row["dt"]).astimezone(tzinfo),
-                type=row["type"],
-                symbol=row["symbol"],
-                qty=float(row["qty"]),
-                price=float(row["price"]),
-                fees=float(row.get("fees", 0.0)),
-                broker_ref=row.get("broker_ref"),
-                notes=row.get("notes"),
-                exchange=row.get("exchange"),
-            )
-            if txn.type in {"BUY", "DRP"}:
-                self._record_buy(txn)
-            elif txn.type == "SELL":
-                specific = specific_maps.get(txn.id or -1)
-                self._record_sell(txn, specific_lots=specific)
-            else:
-                raise ValueError(f"Unsupported transaction type: {txn.type}")
+            specific_maps.setdefault(int(disp["sell_txn_id"]), {})[int(lot_id)] = float(qty)
+
+        # Truncate and replay inside one batch: SQLite commits once (and rolls
+        # back on failure) and the JSON file is written once, instead of a
+        # commit or full rewrite per replayed lot and disposal. Lot ids are
+        # needed by later sells, so rows are still inserted one at a time.
+        # Transactions are streamed so memory stays bounded on long histories.
+        with self.repo.batch():
+            self.repo.truncate_lots()
+            self.repo.truncate_disposals()
+            # Open lots per symbol are tracked in memory during the replay, so
+            # sells match against them instead of querying the repository.
+            open_lots: dict[str, list[Lot]] = {}
+            for row in self.repo.iter_transactions():
+                txn = Transaction(
+                    id=int(row["id"]),
+                    dt=datetime.fromisoformat(row["dt"]).astimezone(tzinfo),
+                    type=row["type"],
+                    symbol=row["symbol"],
+                    qty=float(row["qty"]),
+                    price=float(row["price"]),
+                    fees=float(row.get("fees", 0.0)),
+                    broker_ref=row.get("broker_ref"),
+                    notes=row.get("notes"),
+                    exchange=row.get("exchange"),
+                )
+                if txn.type in {"BUY", "DRP"}:
+                    open_lots.setdefault(txn.symbol, []).append(self._record_buy(txn))
+                elif txn.type == "SELL":
+                    specific = specific_maps.get(txn.id or -1)
+                    symbol_lots = open_lots.get(txn.symbol, [])
+                    self._record_sell(txn, specific_lots=specific, open_lots=symbol_lots)
+                    open_lots[txn.symbol] = [
+                        lot for lot in symbol_lots if lot.qty_remaining > 0
+                    ]
+                else:
+                    raise ValueError(f"Unsupported transaction type: {txn.type}")
 
     # ------------------------------------------------------------------
     def _lot_from_row(self, row: dict) -> Lot:
-        tzinfo = ZoneInfo(self.timezone)
-        acquired_at = datetime.fromisoformat(row["acquired_at"]).astimezone(tzinfo)
+        tz_key = self.timezone
+        acquired_at = parse_iso(row["acquired_at"], tz_key, convert=True)
         threshold_raw = row.get("threshold_date")
-        threshold = (
-            datetime.fromisoformat(threshold_raw).astimezone(tzinfo)
-            if threshold_raw
-            else None
-        )
+        threshold = parse_iso(threshold_raw, tz_key, convert=True) if threshold_raw else None
         return Lot(
             lot_id=row.get("lot_id"),
             symbol=row["symbol"],
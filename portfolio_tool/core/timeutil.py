@@ -0,0 +1,26 @@
+"""Timestamp helpers shared by the core services."""
+from __future__ import annotations
+
+from datetime import datetime
+from functools import lru_cache
+
+from zoneinfo import ZoneInfo
+
+
+@lru_cache(maxsize=8192)
+def parse_iso(value: str, tz_key: str, *, convert: bool = False) -> datetime:
+    """Parse a stored ISO timestamp, treating naive values as ``tz_key`` local time.
+
+    With ``convert`` an aware value is also converted into ``tz_key``.
+    Repository rows repeat the same strings (ledger dates, lot dates re-read on
+    every SELL, the ``fetched_at`` shared by one price refresh), and datetimes
+    are immutable, so the parse is memoised.
+    """
+
+    dt = datetime.fromisoformat(value)
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=ZoneInfo(tz_key))
+    return dt.astimezone(ZoneInfo(tz_key)) if convert else dt
+
+
+__all__ = ["parse_iso"]
@@ -0,0 +1,3 @@
+-- Track quote volatility so the pricing service can derive per-symbol cache TTLs.
+ALTER TABLE price_cache ADD COLUMN volatility_ewma REAL;
+ALTER TABLE price_cache ADD COLUMN effective_ttl_seconds REAL;
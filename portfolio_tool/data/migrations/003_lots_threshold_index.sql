@@ -0,0 +1,4 @@
+-- Serve CGT calendar lookups (open lots by threshold date) from an index.
+CREATE INDEX IF NOT EXISTS idx_lots_open_threshold
+    ON lots(threshold_date)
+    WHERE qty_remaining > 0;
@@ -0,0 +1,4 @@
+-- Serve per-symbol open-lot lookups (one per SELL) in acquisition order.
+CREATE INDEX IF NOT EXISTS idx_lots_open_symbol
+    ON lots(symbol, acquired_at, lot_id)
+    WHERE qty_remaining > 0;
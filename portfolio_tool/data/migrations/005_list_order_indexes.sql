@@ -0,0 +1,15 @@
+-- Serve the unfiltered, ordered listings (transaction history pages, the
+-- lots ledger) and status-filtered actionables without a sort step. Index
+-- entries end with the rowid, so (dt) orders by (dt, id) and (acquired_at)
+-- by (acquired_at, lot_id).
+CREATE INDEX IF NOT EXISTS idx_transactions_dt
+    ON transactions(dt);
+
+CREATE INDEX IF NOT EXISTS idx_lots_acquired
+    ON lots(acquired_at);
+
+-- Supersedes the status-only index from 001.
+CREATE INDEX IF NOT EXISTS idx_actionables_status_created
+    ON actionables(status, created_at);
+
+DROP INDEX IF EXISTS idx_actionables_status;
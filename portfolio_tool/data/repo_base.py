@@ -2,8 +2,10 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
 from dataclasses import dataclass
-from typing import Any, Iterable, Mapping
+from datetime import date
+from typing import Any, Hashable, Iterable, Iterator, Mapping
 
 
 @dataclass(frozen=True)
@@ -26,25 +28,68 @@ class BaseRepository(ABC):
     def close(self) -> None:
         """Close any underlying resources (optional)."""
 
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Group writes into one all-or-nothing unit.
+
+        Writes inside the outermost batch are made durable together when it
+        exits normally; if it exits with an exception, every write made inside
+        it is discarded and the repository is left as it was on entry. Nested
+        batches join the outermost one. Backends without transactional writes
+        inherit this no-op default and persist each write immediately.
+        """
+
+        yield
+
+    def data_version(self) -> Hashable | None:
+        """Return a token that changes whenever stored data changes.
+
+        A failed batch also moves the token, so memos filled inside the batch
+        are not served once it has rolled back. ``None`` means the backend
+        cannot tell, and callers must not cache.
+        """
+
+        return None
+
     # --- transactions --------------------------------------------------
     @abstractmethod
     def add_transaction(self, txn: Mapping[str, Any]) -> int:
         """Insert a transaction and return its identifier."""
 
+    def add_transactions(self, txns: Iterable[Mapping[str, Any]]) -> list[int]:
+        """Insert several transactions in order and return their identifiers."""
+
+        with self.batch():
+            return [self.add_transaction(txn) for txn in txns]
+
     @abstractmethod
     def get_transaction(self, txn_id: int) -> dict[str, Any] | None:
         """Fetch a transaction by identifier."""
 
+    @abstractmethod
+    def get_transactions(self, txn_ids: Iterable[int]) -> dict[int, dict[str, Any]]:
+        """Fetch several transactions keyed by identifier."""
+
     @abstractmethod
     def list_transactions(
         self,
         *,
         symbol: str | None = None,
+        symbols: Iterable[str] | None = None,
         limit: int | None = None,
         offset: int = 0,
         order: str = "asc",
     ) -> list[dict[str, Any]]:
-        """List transactions optionally filtered by symbol."""
+        """List transactions optionally filtered by one or several symbols."""
+
+    def iter_transactions(self, *, batch_size: int = 1000) -> Iterator[dict[str, Any]]:
+        """Yield all transactions in ascending (dt, id) order.
+
+        Backends that can page through a cursor override this so callers
+        replaying history hold at most ``batch_size`` rows at a time.
+        """
+
+        yield from self.list_transactions(order="asc")
 
     @abstractmethod
     def update_transaction(self, txn_id: int, updates: Mapping[str, Any]) -> None:
@@ -54,11 +99,21 @@ class BaseRepository(ABC):
     def delete_transaction(self, txn_id: int) -> None:
         """Remove a transaction by identifier."""
 
+    @abstractmethod
+    def get_latest_exchanges(self, symbols: Iterable[str]) -> dict[str, str | None]:
+        """Return the exchange of each symbol's most recent transaction."""
+
     # --- lots ----------------------------------------------------------
     @abstractmethod
     def add_lot(self, lot: Mapping[str, Any]) -> int:
         """Persist a cost base lot."""
 
+    def add_lots(self, lots: Iterable[Mapping[str, Any]]) -> list[int]:
+        """Persist several lots in order and return their identifiers."""
+
+        with self.batch():
+            return [self.add_lot(lot) for lot in lots]
+
     @abstractmethod
     def update_lot(self, lot_id: int, updates: Mapping[str, Any]) -> None:
         """Update a stored lot."""
@@ -69,13 +124,24 @@ class BaseRepository(ABC):
         *,
         symbol: str | None = None,
         only_open: bool = False,
+        threshold_until: date | None = None,
     ) -> list[dict[str, Any]]:
-        """Return lots, optionally filtered by symbol or open quantity."""
+        """Return lots, optionally filtered by symbol, open quantity or CGT date.
+
+        ``threshold_until`` keeps lots whose threshold falls on or before the
+        given date (compared on the stored local date).
+        """
 
     @abstractmethod
     def delete_lot(self, lot_id: int) -> None:
         """Delete a lot (used for data resets/testing)."""
 
+    def truncate_lots(self) -> None:
+        """Delete every lot; backends may override with a single statement."""
+
+        for row in self.list_lots():
+            self.delete_lot(int(row["lot_id"]))
+
     @abstractmethod
     def aggregate_open_lots(self) -> list[dict[str, Any]]:
         """Return aggregate quantity and cost per symbol for open lots."""
@@ -85,24 +151,44 @@ class BaseRepository(ABC):
     def add_disposal(self, disposal: Mapping[str, Any]) -> int:
         """Insert a disposal slice."""
 
+    def add_disposals(self, disposals: Iterable[Mapping[str, Any]]) -> None:
+        """Insert several disposal slices; backends may override with a bulk path."""
+
+        for disposal in disposals:
+            self.add_disposal(disposal)
+
     @abstractmethod
     def list_disposals(
         self,
         *,
         sell_txn_id: int | None = None,
         lot_id: int | None = None,
+        sell_txn_ids: Iterable[int] | None = None,
+        lot_ids: Iterable[int] | None = None,
     ) -> list[dict[str, Any]]:
-        """List disposal slices filtered by sell transaction or lot."""
+        """List disposal slices filtered by sell transaction(s) or lot(s)."""
 
     @abstractmethod
     def delete_disposals_for_sell(self, sell_txn_id: int) -> None:
         """Remove existing disposal links for a sell transaction."""
 
+    def truncate_disposals(self) -> None:
+        """Delete every disposal; backends may override with a single statement."""
+
+        for sell_txn_id in {row["sell_txn_id"] for row in self.list_disposals()}:
+            self.delete_disposals_for_sell(int(sell_txn_id))
+
     # --- price cache ---------------------------------------------------
     @abstractmethod
     def upsert_price(self, record: Mapping[str, Any]) -> None:
         """Store or update a cached price quote."""
 
+    def upsert_prices(self, records: Iterable[Mapping[str, Any]]) -> None:
+        """Store several cached quotes; backends may override with a bulk path."""
+
+        for record in records:
+            self.upsert_price(record)
+
     @abstractmethod
     def get_prices(self, symbols: Iterable[str]) -> dict[str, dict[str, Any]]:
         """Return cached price quotes for the requested symbols."""
@@ -120,6 +206,14 @@ class BaseRepository(ABC):
     def update_actionable(self, actionable_id: int, updates: Mapping[str, Any]) -> None:
         """Update fields on an actionable item."""
 
+    def update_actionables(
+        self, actionable_ids: Iterable[int], updates: Mapping[str, Any]
+    ) -> None:
+        """Apply the same field updates to several actionables."""
+
+        for actionable_id in actionable_ids:
+            self.update_actionable(actionable_id, updates)
+
     @abstractmethod
     def list_actionables(
         self,
@@ -2,11 +2,23 @@
 from __future__ import annotations
 
 import json
+import mmap
+import os
+import sys
+from bisect import bisect_left, insort
+from contextlib import contextmanager
+from datetime import date
+from operator import itemgetter
 from pathlib import Path
-from typing import Any, Iterable, Mapping
+from typing import Any, Iterable, Iterator, Mapping, TextIO
 
 from .repo_base import BaseRepository, RepositoryError, normalise_order
 
+try:  # Optional C serialiser (``pip install portfolio-tool[fast]``).
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
 _DEFAULT_STATE = {
     "meta": {
         "next_ids": {
@@ -23,130 +35,502 @@ _DEFAULT_STATE = {
     "actionables": [],
 }
 
+_ID_FIELDS = {
+    "transactions": "id",
+    "lots": "lot_id",
+    "disposals": "id",
+    "actionables": "id",
+}
+_SYMBOL_INDEXED = ("transactions", "lots")
+_SORT_FIELDS = {
+    "transactions": ("dt", "id"),
+    "lots": ("acquired_at", "lot_id"),
+}
+_SORT_KEYS = {table: itemgetter(*fields) for table, fields in _SORT_FIELDS.items()}
+
+
+def _dumps_snapshot(state: Mapping[str, Any]) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(state, option=orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS)
+    return json.dumps(state, indent=2, sort_keys=True).encode("utf-8")
+
+
+def _dumps_line(op: Mapping[str, Any]) -> str:
+    if orjson is not None:
+        return orjson.dumps(op).decode("utf-8")
+    return json.dumps(op, separators=(",", ":"))
+
+
+def _load_snapshot(path: Path) -> Any:
+    # orjson parses straight from a read-only mapping of the file, so the
+    # snapshot is never copied into a Python bytes/str object first; the
+    # stdlib parser needs a str, decoded once from the text stream.
+    if orjson is not None and path.stat().st_size:
+        with path.open("rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            with memoryview(mm) as view:
+                return orjson.loads(view)
+    with path.open("r", encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def _loads(data: bytes | str) -> Any:
+    # orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers catch
+    # the stdlib error either way.
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
 
 class JSONRepository(BaseRepository):
-    """Repository that persists state in a JSON document."""
+    """Repository that persists state in a JSON document.
+
+    The document is a snapshot; mutations are appended to a JSON-lines
+    operation log next to it (``<name>.log``) and folded back into the
+    snapshot once the log outgrows it, on ``close()`` and on open.
+    """
 
     def __init__(self, path: Path | str) -> None:
         self.path = Path(path)
+        self.log_path = self.path.with_name(self.path.name + ".log")
         self.path.parent.mkdir(parents=True, exist_ok=True)
         if not self.path.exists():
+            # A log without its snapshot belongs to a deleted store.
+            self.log_path.unlink(missing_ok=True)
             self._write_state(_DEFAULT_STATE)
-        self._state = self._read_state()
+        self._log: TextIO | None = None
+        self._pending: list[str] = []
+        self._batch_depth = 0
+        self._version = 0
+        # Set by every in-memory change, cleared once memory matches disk;
+        # a failed batch reloads only when something actually changed.
+        self._dirty = False
+        self._load()
+        if self._replay_log():
+            self.compact()
+        self._dirty = False
 
     # ------------------------------------------------------------------
     def close(self) -> None:
-        self._write_state(self._state)
+        self.compact()
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        self._batch_depth += 1
+        try:
+            yield
+        except BaseException:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self._rollback()
+            raise
+        self._batch_depth -= 1
+        if self._batch_depth == 0 and self._pending:
+            self._flush_log()
+
+    def data_version(self) -> int:
+        return self._version
+
+    def compact(self) -> None:
+        """Fold the operation log into a fresh snapshot and truncate the log."""
+
+        self._flush_log(compact=False)
+        self._state["meta"]["log_seq"] = self._seq
+        self._write_state(self._snapshot())
+        self._snapshot_size = self.path.stat().st_size
+        if self._log is not None:
+            self._log.truncate(0)
+        elif self.log_path.exists():
+            self.log_path.write_text("", encoding="utf-8")
 
     # ------------------------------------------------------------------
+    def _load(self) -> None:
+        """Read the snapshot and rebuild the in-memory tables and indexes."""
+
+        self._state = self._read_state()
+        self._build_indices()
+        self._seq = int(self._state["meta"].get("log_seq", 0))
+        self._snapshot_size = self.path.stat().st_size
+
+    def _rollback(self) -> None:
+        """Discard the writes of a failed batch.
+
+        Outside a batch every write is flushed as it happens, so the snapshot
+        plus the log on disk hold exactly the state the outermost batch
+        started from; reloading them restores it without keeping a copy of
+        every table for the (common) successful case. This includes changes
+        a write made in memory before it failed and was never logged.
+        """
+
+        if not self._dirty:
+            return
+        self._pending.clear()
+        self._load()
+        self._replay_log()
+        self._dirty = False
+        # Never reuse a version token: state read inside the batch is gone.
+        self._version += 1
+
     def _read_state(self) -> dict[str, Any]:
         try:
-            with self.path.open("r", encoding="utf-8") as fh:
-                return json.load(fh)
+            return _load_snapshot(self.path)
         except json.JSONDecodeError as exc:  # pragma: no cover - defensive
             raise RepositoryError(f"Invalid JSON repository: {exc}") from exc
 
+    def _build_indices(self) -> None:
+        """Key each row table by id for O(1) lookups, updates and deletes.
+
+        Dicts keep insertion order, so iterating ``.values()`` matches the
+        on-disk list order; ``_snapshot`` turns the tables back into lists.
+        Ids are allocated increasingly and rows are only ever appended, so the
+        tables stay in id order; sorting once on load (a linear pass for an
+        already ordered file) guarantees that for hand-edited files too.
+        """
+
+        for table, key in _ID_FIELDS.items():
+            rows = sorted(self._state[table], key=itemgetter(key))
+            self._state[table] = {row[key]: row for row in rows}
+        # Interned symbols share one string object per ticker instead of one
+        # per parsed row, and dict lookups on them short-circuit on identity.
+        for table in _SYMBOL_INDEXED:
+            for row in self._state[table].values():
+                row["symbol"] = sys.intern(row["symbol"])
+        prices = self._state["price_cache"]
+        self._state["price_cache"] = {}
+        for row in prices.values():
+            self._store_price(row)
+        # Secondary ``symbol -> {id: row}`` indexes for the tables that are
+        # routinely filtered by symbol; they share the row dicts above.
+        self._by_symbol: dict[str, dict[str, dict[int, dict[str, Any]]]] = {}
+        for table in _SYMBOL_INDEXED:
+            key = _ID_FIELDS[table]
+            index: dict[str, dict[int, dict[str, Any]]] = {}
+            for row in self._state[table].values():
+                index.setdefault(row["symbol"], {})[row[key]] = row
+            self._by_symbol[table] = index
+        # Full-table rows in list order, built on first read and then kept
+        # sorted on insert/delete so repeated reads do not re-sort.
+        self._sorted: dict[str, list[dict[str, Any]]] = {}
+
+    def _sorted_rows(self, table: str) -> list[dict[str, Any]]:
+        rows = self._sorted.get(table)
+        if rows is None:
+            rows = sorted(self._state[table].values(), key=_SORT_KEYS[table])
+            self._sorted[table] = rows
+        return rows
+
+    def _store_price(self, row: dict[str, Any]) -> None:
+        self._dirty = True
+        symbol = row["symbol"] = sys.intern(row["symbol"])
+        self._state["price_cache"][symbol] = row
+
+    def _purge_price(self, symbol: str) -> bool:
+        if self._state["price_cache"].pop(symbol, None) is None:
+            return False
+        self._dirty = True
+        return True
+
+    def _insert_row(self, table: str, row: dict[str, Any]) -> None:
+        self._dirty = True
+        if table in _SYMBOL_INDEXED:
+            row["symbol"] = sys.intern(row["symbol"])
+        row_id = row[_ID_FIELDS[table]]
+        self._state[table][row_id] = row
+        index = self._by_symbol.get(table)
+        if index is not None:
+            index.setdefault(row["symbol"], {})[row_id] = row
+        ordered = self._sorted.get(table)
+        if ordered is not None:
+            insort(ordered, row, key=_SORT_KEYS[table])
+
+    def _update_row(self, table: str, row: dict[str, Any], updates: Mapping[str, Any]) -> None:
+        self._dirty = True
+        if table in self._sorted and any(field in updates for field in _SORT_FIELDS[table]):
+            del self._sorted[table]
+        index = self._by_symbol.get(table)
+        if index is None or "symbol" not in updates or updates["symbol"] == row["symbol"]:
+            row.update(updates)
+            return
+        self._unindex(index, table, row)
+        row.update(updates)
+        row["symbol"] = sys.intern(row["symbol"])
+        index.setdefault(row["symbol"], {})[row[_ID_FIELDS[table]]] = row
+
+    def _pop_row(self, table: str, row_id: int) -> dict[str, Any] | None:
+        self._dirty = True
+        row = self._state[table].pop(row_id, None)
+        index = self._by_symbol.get(table)
+        if row is not None and index is not None:
+            self._unindex(index, table, row)
+        ordered = self._sorted.get(table)
+        if row is not None and ordered is not None:
+            key = _SORT_KEYS[table]
+            pos = bisect_left(ordered, key(row), key=key)
+            if pos < len(ordered) and ordered[pos] is row:
+                del ordered[pos]
+            else:  # pragma: no cover - defensive, rebuilt on next read
+                del self._sorted[table]
+        return row
+
+    def _clear_table(self, table: str) -> None:
+        self._dirty = True
+        self._state[table] = {}
+        if table in self._by_symbol:
+            self._by_symbol[table] = {}
+        self._sorted.pop(table, None)
+
+    @staticmethod
+    def _unindex(
+        index: dict[str, dict[int, dict[str, Any]]], table: str, row: Mapping[str, Any]
+    ) -> None:
+        bucket = index.get(row["symbol"])
+        if bucket is None:
+            return
+        bucket.pop(row[_ID_FIELDS[table]], None)
+        if not bucket:
+            del index[row["symbol"]]
+
+    def _snapshot(self) -> dict[str, Any]:
+        snapshot = dict(self._state)
+        for table in _ID_FIELDS:
+            snapshot[table] = list(self._state[table].values())
+        return snapshot
+
     def _write_state(self, state: Mapping[str, Any]) -> None:
-        with self.path.open("w", encoding="utf-8") as fh:
-            json.dump(state, fh, indent=2, sort_keys=True)
+        # Write-then-rename so a crash never leaves a half-written snapshot; the
+        # ``log_seq`` stored in it tells the replay which log lines it covers.
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with tmp_path.open("wb") as fh:
+            fh.write(_dumps_snapshot(state))
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp_path, self.path)
+
+    def _replay_log(self) -> bool:
+        """Apply logged operations newer than the snapshot; True if any."""
+
+        if not self.log_path.exists():
+            return False
+        replayed = False
+        with self.log_path.open("r", encoding="utf-8") as fh:
+            for line in fh:
+                if not line.strip():
+                    continue
+                try:
+                    op = _loads(line)
+                except json.JSONDecodeError:
+                    # A torn final line from an interrupted write; everything
+                    # before it is intact and the compaction drops the rest.
+                    replayed = True
+                    break
+                replayed = True
+                if op["seq"] <= self._seq:
+                    continue
+                self._apply(op)
+                self._seq = op["seq"]
+        return replayed
+
+    def _apply(self, op: Mapping[str, Any]) -> None:
+        kind = op["op"]
+        if kind == "prices":
+            for record in op["rows"]:
+                self._store_price(record)
+            return
+        if kind == "purge_price":
+            self._purge_price(op["symbol"])
+            return
+        table = op["table"]
+        if kind == "insert":
+            key = _ID_FIELDS[table]
+            counter = self._state["meta"]["next_ids"]
+            for row in op["rows"]:
+                self._insert_row(table, row)
+                counter[table] = max(counter[table], row[key] + 1)
+        elif kind == "update":
+            rows = self._state[table]
+            for row_id in op["ids"]:
+                row = rows.get(row_id)
+                if row is not None:
+                    self._update_row(table, row, op["set"])
+        elif kind == "delete":
+            for row_id in op["ids"]:
+                self._pop_row(table, row_id)
+        elif kind == "truncate":
+            self._clear_table(table)
+        else:  # pragma: no cover - defensive
+            raise RepositoryError(f"Unknown JSON repository operation: {kind}")
+
+    def _insert_many(self, table: str, records: Iterable[Mapping[str, Any]]) -> list[int]:
+        """Insert several rows as one logged operation; return their ids."""
+
+        key = _ID_FIELDS[table]
+        added = [{key: self._next_id(table), **record} for record in records]
+        if not added:
+            return []
+        for row in added:
+            self._insert_row(table, row)
+        self._persist({"op": "insert", "table": table, "rows": added})
+        return [row[key] for row in added]
 
     def _next_id(self, key: str) -> int:
+        self._dirty = True
         counter = self._state["meta"]["next_ids"]
         value = counter[key]
         counter[key] = value + 1
         return value
 
-    def _persist(self) -> None:
-        self._write_state(self._state)
+    def _persist(self, op: dict[str, Any]) -> None:
+        """Log an operation that has already been applied to ``_state``."""
+
+        self._version += 1
+        self._seq += 1
+        op["seq"] = self._seq
+        # Serialise now: rows in ``op`` are live state and may change later in
+        # the same batch.
+        self._pending.append(_dumps_line(op))
+        if not self._batch_depth:
+            self._flush_log()
+
+    def _flush_log(self, *, compact: bool = True) -> None:
+        if not self._pending:
+            return
+        if self._log is None:
+            self._log = self.log_path.open("a", encoding="utf-8")
+        self._log.write("\n".join(self._pending) + "\n")
+        self._log.flush()
+        self._pending.clear()
+        self._dirty = False
+        if compact and self._log.tell() > self._snapshot_size:
+            self.compact()
 
     # --- transactions --------------------------------------------------
     def add_transaction(self, txn: Mapping[str, Any]) -> int:
         txn_id = self._next_id("transactions")
         record = {"id": txn_id, **txn}
-        self._state["transactions"].append(record)
-        self._persist()
+        self._insert_row("transactions", record)
+        self._persist({"op": "insert", "table": "transactions", "rows": [record]})
         return txn_id
 
+    def add_transactions(self, txns: Iterable[Mapping[str, Any]]) -> list[int]:
+        return self._insert_many("transactions", txns)
+
     def get_transaction(self, txn_id: int) -> dict[str, Any] | None:
-        for row in self._state["transactions"]:
-            if row["id"] == txn_id:
-                return row.copy()
-        return None
+        row = self._state["transactions"].get(txn_id)
+        return row.copy() if row is not None else None
+
+    def get_transactions(self, txn_ids: Iterable[int]) -> dict[int, dict[str, Any]]:
+        rows = self._state["transactions"]
+        return {txn_id: rows[txn_id].copy() for txn_id in set(txn_ids) if txn_id in rows}
 
     def list_transactions(
         self,
         *,
         symbol: str | None = None,
+        symbols: Iterable[str] | None = None,
         limit: int | None = None,
         offset: int = 0,
         order: str = "asc",
     ) -> list[dict[str, Any]]:
         order = normalise_order(order)
-        rows = [row.copy() for row in self._state["transactions"]]
-        if symbol:
-            rows = [row for row in rows if row["symbol"] == symbol]
-        rows.sort(key=lambda r: (r["dt"], r["id"]), reverse=order == "desc")
+        if symbol or symbols is not None:
+            wanted = set(symbols) if symbols is not None else {symbol}
+            if symbol:
+                wanted &= {symbol}
+            index = self._by_symbol["transactions"]
+            rows = sorted(
+                (row for key in wanted for row in index.get(key, {}).values()),
+                key=_SORT_KEYS["transactions"],
+            )
+        else:
+            rows = self._sorted_rows("transactions")
+        if order == "desc":
+            rows = rows[::-1]
         if limit is not None:
             rows = rows[offset : offset + limit]
-        return rows
+        return [row.copy() for row in rows]
+
+    def iter_transactions(self, *, batch_size: int = 1000) -> Iterator[dict[str, Any]]:
+        # Iterate a snapshot of the ordering so writes during iteration are safe.
+        for row in tuple(self._sorted_rows("transactions")):
+            yield row.copy()
 
     def update_transaction(self, txn_id: int, updates: Mapping[str, Any]) -> None:
-        for row in self._state["transactions"]:
-            if row["id"] == txn_id:
-                row.update(updates)
-                self._persist()
-                return
-        raise RepositoryError(f"Transaction {txn_id} not found")
+        row = self._state["transactions"].get(txn_id)
+        if row is None:
+            raise RepositoryError(f"Transaction {txn_id} not found")
+        self._update_row("transactions", row, updates)
+        self._persist(
+            {"op": "update", "table": "transactions", "ids": [txn_id], "set": dict(updates)}
+        )
 
     def delete_transaction(self, txn_id: int) -> None:
-        rows = self._state["transactions"]
-        for idx, row in enumerate(rows):
-            if row["id"] == txn_id:
-                rows.pop(idx)
-                self._persist()
-                return
+        if self._pop_row("transactions", txn_id) is not None:
+            self._persist({"op": "delete", "table": "transactions", "ids": [txn_id]})
+
+    def get_latest_exchanges(self, symbols: Iterable[str]) -> dict[str, str | None]:
+        index = self._by_symbol["transactions"]
+        latest: dict[str, str | None] = {}
+        for symbol in set(symbols):
+            bucket = index.get(symbol)
+            if bucket:
+                row = max(bucket.values(), key=_SORT_KEYS["transactions"])
+                latest[symbol] = row.get("exchange")
+        return latest
 
     # --- lots ----------------------------------------------------------
     def add_lot(self, lot: Mapping[str, Any]) -> int:
         lot_id = self._next_id("lots")
         record = {"lot_id": lot_id, **lot}
-        self._state["lots"].append(record)
-        self._persist()
+        self._insert_row("lots", record)
+        self._persist({"op": "insert", "table": "lots", "rows": [record]})
         return lot_id
 
+    def add_lots(self, lots: Iterable[Mapping[str, Any]]) -> list[int]:
+        return self._insert_many("lots", lots)
+
     def update_lot(self, lot_id: int, updates: Mapping[str, Any]) -> None:
-        for row in self._state["lots"]:
-            if row["lot_id"] == lot_id:
-                row.update(updates)
-                self._persist()
-                return
-        raise RepositoryError(f"Lot {lot_id} not found")
+        row = self._state["lots"].get(lot_id)
+        if row is None:
+            raise RepositoryError(f"Lot {lot_id} not found")
+        self._update_row("lots", row, updates)
+        self._persist({"op": "update", "table": "lots", "ids": [lot_id], "set": dict(updates)})
 
     def list_lots(
         self,
         *,
         symbol: str | None = None,
         only_open: bool = False,
+        threshold_until: date | None = None,
     ) -> list[dict[str, Any]]:
-        rows = [row.copy() for row in self._state["lots"]]
         if symbol:
-            rows = [row for row in rows if row["symbol"] == symbol]
+            bucket = self._by_symbol["lots"].get(symbol, {})
+            rows = sorted(bucket.values(), key=_SORT_KEYS["lots"])
+        else:
+            rows = self._sorted_rows("lots")
         if only_open:
             rows = [row for row in rows if row.get("qty_remaining", 0) > 0]
-        rows.sort(key=lambda r: (r.get("acquired_at"), r["lot_id"]))
-        return rows
+        if threshold_until is not None:
+            until = threshold_until.isoformat()
+            rows = [
+                row
+                for row in rows
+                if row.get("threshold_date") and row["threshold_date"][:10] <= until
+            ]
+        return [row.copy() for row in rows]
 
     def delete_lot(self, lot_id: int) -> None:
-        rows = self._state["lots"]
-        for idx, row in enumerate(rows):
-            if row["lot_id"] == lot_id:
-                rows.pop(idx)
-                self._persist()
-                return
+        if self._pop_row("lots", lot_id) is not None:
+            self._persist({"op": "delete", "table": "lots", "ids": [lot_id]})
+
+    def truncate_lots(self) -> None:
+        self._clear_table("lots")
+        self._persist({"op": "truncate", "table": "lots"})
 
     def aggregate_open_lots(self) -> list[dict[str, Any]]:
         aggregates: dict[str, tuple[float, float]] = {}
-        for row in self._state["lots"]:
+        for row in self._state["lots"].values():
             qty = float(row.get("qty_remaining", 0.0) or 0.0)
             if qty <= 0:
                 continue
@@ -163,63 +547,109 @@ class JSONRepository(BaseRepository):
     def add_disposal(self, disposal: Mapping[str, Any]) -> int:
         disp_id = self._next_id("disposals")
         record = {"id": disp_id, **disposal}
-        self._state["disposals"].append(record)
-        self._persist()
+        self._insert_row("disposals", record)
+        self._persist({"op": "insert", "table": "disposals", "rows": [record]})
         return disp_id
 
+    def add_disposals(self, disposals: Iterable[Mapping[str, Any]]) -> None:
+        self._insert_many("disposals", disposals)
+
     def list_disposals(
         self,
         *,
         sell_txn_id: int | None = None,
         lot_id: int | None = None,
+        sell_txn_ids: Iterable[int] | None = None,
+        lot_ids: Iterable[int] | None = None,
     ) -> list[dict[str, Any]]:
-        rows = [row.copy() for row in self._state["disposals"]]
+        if sell_txn_ids is not None and lot_ids is not None:
+            raise RepositoryError("Filter disposals by sell_txn_ids or lot_ids, not both")
+        rows = list(self._state["disposals"].values())
         if sell_txn_id is not None:
             rows = [row for row in rows if row.get("sell_txn_id") == sell_txn_id]
         if lot_id is not None:
             rows = [row for row in rows if row.get("lot_id") == lot_id]
-        rows.sort(key=lambda r: r["id"])
-        return rows
+        if sell_txn_ids is not None:
+            wanted = set(sell_txn_ids)
+            rows = [row for row in rows if row.get("sell_txn_id") in wanted]
+        if lot_ids is not None:
+            wanted = set(lot_ids)
+            rows = [row for row in rows if row.get("lot_id") in wanted]
+        # Already in id order: see _build_indices.
+        return [row.copy() for row in rows]
 
     def delete_disposals_for_sell(self, sell_txn_id: int) -> None:
         rows = self._state["disposals"]
-        self._state["disposals"] = [
-            row for row in rows if row.get("sell_txn_id") != sell_txn_id
+        removed = [
+            disp_id for disp_id, row in rows.items() if row.get("sell_txn_id") == sell_txn_id
         ]
-        self._persist()
+        if not removed:
+            return
+        for disp_id in removed:
+            self._pop_row("disposals", disp_id)
+        self._persist({"op": "delete", "table": "disposals", "ids": removed})
+
+    def truncate_disposals(self) -> None:
+        self._clear_table("disposals")
+        self._persist({"op": "truncate", "table": "disposals"})
 
     # --- price cache ---------------------------------------------------
     def upsert_price(self, record: Mapping[str, Any]) -> None:
-        symbol = record["symbol"]
-        self._state["price_cache"][symbol] = dict(record)
-        self._persist()
+        row = dict(record)
+        self._store_price(row)
+        self._persist({"op": "prices", "rows": [row]})
+
+    def upsert_prices(self, records: Iterable[Mapping[str, Any]]) -> None:
+        rows = [dict(record) for record in records]
+        if not rows:
+            return
+        for row in rows:
+            self._store_price(row)
+        self._persist({"op": "prices", "rows": rows})
 
     def get_prices(self, symbols: Iterable[str]) -> dict[str, dict[str, Any]]:
+        cache = self._state["price_cache"]
         return {
-            symbol: self._state["price_cache"][symbol].copy()
+            symbol: row.copy()
             for symbol in symbols
-            if symbol in self._state["price_cache"]
+            if (row := cache.get(symbol)) is not None
         }
 
     def purge_price(self, symbol: str) -> None:
-        self._state["price_cache"].pop(symbol, None)
-        self._persist()
+        if self._purge_price(symbol):
+            self._persist({"op": "purge_price", "symbol": symbol})
 
     # --- actionables ---------------------------------------------------
     def add_actionable(self, actionable: Mapping[str, Any]) -> int:
         actionable_id = self._next_id("actionables")
         record = {"id": actionable_id, **actionable}
-        self._state["actionables"].append(record)
-        self._persist()
+        self._insert_row("actionables", record)
+        self._persist({"op": "insert", "table": "actionables", "rows": [record]})
         return actionable_id
 
     def update_actionable(self, actionable_id: int, updates: Mapping[str, Any]) -> None:
-        for row in self._state["actionables"]:
-            if row["id"] == actionable_id:
-                row.update(updates)
-                self._persist()
-                return
-        raise RepositoryError(f"Actionable {actionable_id} not found")
+        row = self._state["actionables"].get(actionable_id)
+        if row is None:
+            raise RepositoryError(f"Actionable {actionable_id} not found")
+        self._update_row("actionables", row, updates)
+        self._persist(
+            {"op": "update", "table": "actionables", "ids": [actionable_id], "set": dict(updates)}
+        )
+
+    def update_actionables(
+        self, actionable_ids: Iterable[int], updates: Mapping[str, Any]
+    ) -> None:
+        wanted = set(actionable_ids)
+        if not wanted:
+            return
+        rows = self._state["actionables"]
+        for actionable_id in wanted:
+            row = rows.get(actionable_id)
+            if row is not None:
+                self._update_row("actionables", row, updates)
+        self._persist(
+            {"op": "update", "table": "actionables", "ids": sorted(wanted), "set": dict(updates)}
+        )
 
     def list_actionables(
         self,
@@ -227,13 +657,13 @@ class JSONRepository(BaseRepository):
         status: str | None = None,
         include_snoozed: bool = True,
     ) -> list[dict[str, Any]]:
-        rows = [row.copy() for row in self._state["actionables"]]
+        rows = list(self._state["actionables"].values())
         if status:
             rows = [row for row in rows if row.get("status") == status]
         if not include_snoozed:
             rows = [row for row in rows if row.get("snoozed_until") in (None, "")]
-        rows.sort(key=lambda r: r["created_at"])
-        return rows
+        rows.sort(key=itemgetter("created_at"))
+        return [row.copy() for row in rows]
 
 
 __all__ = ["JSONRepository"]
@@ -2,13 +2,72 @@
 from __future__ import annotations
 
 import sqlite3
+from contextlib import contextmanager
+from datetime import date, timedelta
+from functools import lru_cache
+from itertools import groupby
+from operator import itemgetter
 from pathlib import Path
-from typing import Any, Iterable, Mapping
+from typing import Any, Iterable, Iterator, Mapping
 
 from .repo_base import BaseRepository, RepositoryError, normalise_order
 
 MIGRATIONS_DIR = Path(__file__).with_suffix("").parent / "migrations"
 
+# Stay well below SQLITE_MAX_VARIABLE_NUMBER on older builds (999).
+_IN_CHUNK_SIZE = 500
+
+# Prepared statements kept per connection (sqlite3 defaults to 128). The
+# repository issues a few dozen fixed statements plus chunked IN-list and
+# per-column-set INSERT variants; sizing the cache above that working set
+# keeps hot statements from being evicted and re-prepared.
+_STATEMENT_CACHE_SIZE = 512
+
+
+@lru_cache(maxsize=128)
+def _insert_sql(table: str, columns: tuple[str, ...]) -> str:
+    """Return the INSERT for *table* and *columns*, built once per column set.
+
+    Callers pass the same few row shapes over and over; reusing the string
+    skips rebuilding it and hands sqlite3 identical text for its statement
+    cache.
+    """
+
+    placeholders = ", ".join("?" * len(columns))
+    return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders});"
+
+
+@lru_cache(maxsize=128)
+def _update_sql(table: str, key: str, columns: tuple[str, ...]) -> str:
+    assignments = ", ".join(f"{col} = ?" for col in columns)
+    return f"UPDATE {table} SET {assignments} WHERE {key} = ?;"
+
+
+@lru_cache(maxsize=16)
+def _upsert_price_sql(columns: tuple[str, ...]) -> str:
+    assignments = ", ".join(f"{col} = excluded.{col}" for col in columns if col != "symbol")
+    return (
+        _insert_sql("price_cache", columns)[:-1]
+        + f" ON CONFLICT(symbol) DO UPDATE SET {assignments};"
+    )
+
+
+def _column_runs(
+    rows: Iterable[Mapping[str, Any]],
+) -> Iterator[tuple[tuple[str, ...], list[tuple[Any, ...]]]]:
+    """Split rows into consecutive runs sharing one column set, keeping order.
+
+    Each run becomes one executemany, so rows whose keys differ (an optional
+    column present on only some of them) keep every value they carry.
+    """
+
+    for columns, run in groupby(rows, key=tuple):
+        yield columns, [tuple(row[col] for col in columns) for row in run]
+
+
+def _column_names(cur: sqlite3.Cursor) -> tuple[str, ...]:
+    return tuple(column[0] for column in cur.description)
+
 
 class SQLiteRepository(BaseRepository):
     """Repository backed by a SQLite database file."""
@@ -16,8 +75,14 @@ class SQLiteRepository(BaseRepository):
     def __init__(self, path: Path | str) -> None:
         self.path = Path(path)
         self.path.parent.mkdir(parents=True, exist_ok=True)
-        self._conn = sqlite3.connect(self.path)
-        self._conn.row_factory = sqlite3.Row
+        self._conn = sqlite3.connect(self.path, cached_statements=_STATEMENT_CACHE_SIZE)
+        self._batch_depth = 0
+        self._rollbacks = 0
+        # Read-through cache of price_cache rows (None marks a known miss),
+        # valid while no other connection has committed; see get_prices.
+        self._price_rows: dict[str, dict[str, Any] | None] = {}
+        self._price_rows_version: int | None = None
+        self._configure_connection()
         self._apply_migrations()
 
     # ------------------------------------------------------------------
@@ -25,7 +90,46 @@ class SQLiteRepository(BaseRepository):
         if getattr(self, "_conn", None) is not None:
             self._conn.close()
 
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        self._batch_depth += 1
+        try:
+            yield
+        except BaseException:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self._conn.rollback()
+                self._rollbacks += 1
+                self._price_rows.clear()
+            raise
+        self._batch_depth -= 1
+        if self._batch_depth == 0:
+            self._conn.commit()
+
+    def data_version(self) -> tuple[int, int, int]:
+        # total_changes counts rows written through this connection;
+        # PRAGMA data_version moves when another connection commits. Neither
+        # goes back on a rollback, so the rollback count is part of the token.
+        other = self._conn.execute("PRAGMA data_version;").fetchone()[0]
+        return (self._conn.total_changes, other, self._rollbacks)
+
     # ------------------------------------------------------------------
+    def _configure_connection(self) -> None:
+        conn = self._conn
+        # WAL lets readers proceed during writes and, with synchronous=NORMAL,
+        # fsyncs at checkpoints rather than on every commit. A crash can lose
+        # the last commits but never corrupts the database.
+        conn.execute("PRAGMA journal_mode = WAL;")
+        conn.execute("PRAGMA synchronous = NORMAL;")
+        conn.execute("PRAGMA temp_store = MEMORY;")
+        # ~64 MB page cache (negative values are KiB) and memory-mapped reads
+        # of up to 256 MB keep a full portfolio database hot.
+        conn.execute("PRAGMA cache_size = -64000;")
+        conn.execute("PRAGMA mmap_size = 268435456;")
+        # Wait for a concurrent writer (e.g. the TUI and a CLI refresh) instead
+        # of failing immediately with "database is locked".
+        conn.execute("PRAGMA busy_timeout = 5000;")
+
     def _apply_migrations(self) -> None:
         conn = self._conn
         conn.execute("PRAGMA foreign_keys = ON;")
@@ -33,8 +137,7 @@ class SQLiteRepository(BaseRepository):
             "CREATE TABLE IF NOT EXISTS schema_migrations (version TEXT PRIMARY KEY);"
         )
         applied = {
-            row["version"]
-            for row in conn.execute("SELECT version FROM schema_migrations;")
+            row[0] for row in conn.execute("SELECT version FROM schema_migrations;")
         }
         for path in sorted(MIGRATIONS_DIR.glob("*.sql")):
             version = path.stem.split("_")[0]
@@ -49,84 +152,198 @@ class SQLiteRepository(BaseRepository):
 
     # ------------------------------------------------------------------
     def _execute(self, query: str, params: tuple[Any, ...] = ()) -> sqlite3.Cursor:
+        """Run a write, committing it unless a batch is open."""
+
         try:
             cur = self._conn.execute(query, params)
-            self._conn.commit()
+            if not self._batch_depth:
+                self._conn.commit()
             return cur
         except sqlite3.DatabaseError as exc:  # pragma: no cover - defensive
             raise RepositoryError(str(exc)) from exc
 
+    def _executemany(self, query: str, params: Iterable[tuple[Any, ...]]) -> None:
+        try:
+            self._conn.executemany(query, params)
+            if not self._batch_depth:
+                self._conn.commit()
+        except sqlite3.DatabaseError as exc:  # pragma: no cover - defensive
+            raise RepositoryError(str(exc)) from exc
+
+    def _query(self, query: str, params: tuple[Any, ...] = ()) -> sqlite3.Cursor:
+        """Run a read; unlike ``_execute`` it never commits."""
+
+        try:
+            return self._conn.execute(query, params)
+        except sqlite3.DatabaseError as exc:  # pragma: no cover - defensive
+            raise RepositoryError(str(exc)) from exc
+
     def _fetchall(self, query: str, params: tuple[Any, ...] = ()) -> list[dict[str, Any]]:
-        cur = self._execute(query, params)
-        return [dict(row) for row in cur.fetchall()]
+        cur = self._query(query, params)
+        # Rows come back as plain tuples (no row_factory); zipping them with
+        # the column names once per query builds each dict in one step instead
+        # of materialising a sqlite3.Row and then copying it into a dict.
+        names = _column_names(cur)
+        return [dict(zip(names, row)) for row in cur.fetchall()]
+
+    def _insert_many(self, table: str, rows: list[Mapping[str, Any]]) -> list[int]:
+        """Insert rows in order and return their rowids.
+
+        One executemany per run of rows sharing a column set, all inside one
+        transaction. The write lock is held throughout, so the new rowids are
+        consecutive and end at last_insert_rowid().
+        """
+
+        if not rows:
+            return []
+        with self.batch():
+            for columns, params in _column_runs(rows):
+                self._executemany(_insert_sql(table, columns), params)
+            last = self._conn.execute("SELECT last_insert_rowid();").fetchone()[0]
+        return list(range(last - len(rows) + 1, last + 1))
+
+    def _fetch_in(
+        self,
+        query: str,
+        clauses: list[str],
+        params: list[Any],
+        column: str,
+        values: Iterable[Any],
+        order_by: str,
+    ) -> list[dict[str, Any]]:
+        """Run *query* filtered by ``column IN (values)``, chunking large lists."""
+
+        value_list = list(values)
+        rows: list[dict[str, Any]] = []
+        for start in range(0, len(value_list), _IN_CHUNK_SIZE):
+            chunk = value_list[start : start + _IN_CHUNK_SIZE]
+            placeholders = ", ".join(["?"] * len(chunk))
+            where = clauses + [f"{column} IN ({placeholders})"]
+            rows.extend(
+                self._fetchall(
+                    f"{query} WHERE {' AND '.join(where)} ORDER BY {order_by};",
+                    tuple(params) + tuple(chunk),
+                )
+            )
+        return rows
 
     # --- transactions --------------------------------------------------
     def add_transaction(self, txn: Mapping[str, Any]) -> int:
-        columns = ", ".join(txn.keys())
-        placeholders = ", ".join(["?"] * len(txn))
-        cur = self._execute(
-            f"INSERT INTO transactions ({columns}) VALUES ({placeholders});",
-            tuple(txn.values()),
-        )
+        cur = self._execute(_insert_sql("transactions", tuple(txn)), tuple(txn.values()))
         return int(cur.lastrowid)
 
+    def add_transactions(self, txns: Iterable[Mapping[str, Any]]) -> list[int]:
+        return self._insert_many("transactions", list(txns))
+
     def get_transaction(self, txn_id: int) -> dict[str, Any] | None:
-        cur = self._execute(
-            "SELECT * FROM transactions WHERE id = ?;", (txn_id,)
-        )
+        cur = self._query("SELECT * FROM transactions WHERE id = ?;", (txn_id,))
         row = cur.fetchone()
-        return dict(row) if row else None
+        return dict(zip(_column_names(cur), row)) if row else None
+
+    def get_transactions(self, txn_ids: Iterable[int]) -> dict[int, dict[str, Any]]:
+        rows = self._fetch_in(
+            "SELECT * FROM transactions", [], [], "id", set(txn_ids), "id ASC"
+        )
+        return {row["id"]: row for row in rows}
 
     def list_transactions(
         self,
         *,
         symbol: str | None = None,
+        symbols: Iterable[str] | None = None,
         limit: int | None = None,
         offset: int = 0,
         order: str = "asc",
     ) -> list[dict[str, Any]]:
         order = normalise_order(order)
+        order_by = f"dt {order.upper()}, id {order.upper()}"
         query = "SELECT * FROM transactions"
+        clauses: list[str] = []
         params: list[Any] = []
         if symbol:
-            query += " WHERE symbol = ?"
+            clauses.append("symbol = ?")
             params.append(symbol)
-        query += f" ORDER BY dt {order.upper()}"
+        if symbols is not None:
+            values = set(symbols)
+            rows = self._fetch_in(query, clauses, params, "symbol", values, order_by)
+            if len(values) > _IN_CHUNK_SIZE:
+                rows.sort(key=itemgetter("dt", "id"), reverse=order == "desc")
+            if limit is not None:
+                rows = rows[offset : offset + limit]
+            return rows
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += f" ORDER BY {order_by}"
         if limit is not None:
             query += " LIMIT ? OFFSET ?"
             params.extend([limit, offset])
         return self._fetchall(query + ";", tuple(params))
 
+    def iter_transactions(self, *, batch_size: int = 1000) -> Iterator[dict[str, Any]]:
+        try:
+            cur = self._conn.execute("SELECT * FROM transactions ORDER BY dt ASC, id ASC;")
+            names = _column_names(cur)
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    return
+                for row in rows:
+                    yield dict(zip(names, row))
+        except sqlite3.DatabaseError as exc:  # pragma: no cover - defensive
+            raise RepositoryError(str(exc)) from exc
+
     def update_transaction(self, txn_id: int, updates: Mapping[str, Any]) -> None:
-        assignments = ", ".join(f"{k} = ?" for k in updates)
-        params = list(updates.values()) + [txn_id]
         self._execute(
-            f"UPDATE transactions SET {assignments} WHERE id = ?;", tuple(params)
+            _update_sql("transactions", "id", tuple(updates)), (*updates.values(), txn_id)
         )
 
     def delete_transaction(self, txn_id: int) -> None:
         self._execute("DELETE FROM transactions WHERE id = ?;", (txn_id,))
 
+    def get_latest_exchanges(self, symbols: Iterable[str]) -> dict[str, str | None]:
+        sym_list = list(set(symbols))
+        latest: dict[str, str | None] = {}
+        # The IN list sits inside a window-function subquery, so chunk here
+        # rather than through _fetch_in.
+        for start in range(0, len(sym_list), _IN_CHUNK_SIZE):
+            chunk = sym_list[start : start + _IN_CHUNK_SIZE]
+            placeholders = ", ".join(["?"] * len(chunk))
+            rows = self._fetchall(
+                f"""
+                SELECT symbol, exchange
+                FROM (
+                    SELECT symbol,
+                           exchange,
+                           ROW_NUMBER() OVER (
+                               PARTITION BY symbol ORDER BY dt DESC, id DESC
+                           ) AS rn
+                    FROM transactions
+                    WHERE symbol IN ({placeholders})
+                )
+                WHERE rn = 1;
+                """,
+                tuple(chunk),
+            )
+            latest.update((row["symbol"], row["exchange"]) for row in rows)
+        return latest
+
     # --- lots ----------------------------------------------------------
     def add_lot(self, lot: Mapping[str, Any]) -> int:
-        columns = ", ".join(lot.keys())
-        placeholders = ", ".join(["?"] * len(lot))
-        cur = self._execute(
-            f"INSERT INTO lots ({columns}) VALUES ({placeholders});",
-            tuple(lot.values()),
-        )
+        cur = self._execute(_insert_sql("lots", tuple(lot)), tuple(lot.values()))
         return int(cur.lastrowid)
 
+    def add_lots(self, lots: Iterable[Mapping[str, Any]]) -> list[int]:
+        return self._insert_many("lots", list(lots))
+
     def update_lot(self, lot_id: int, updates: Mapping[str, Any]) -> None:
-        assignments = ", ".join(f"{k} = ?" for k in updates)
-        params = list(updates.values()) + [lot_id]
-        self._execute(f"UPDATE lots SET {assignments} WHERE lot_id = ?;", tuple(params))
+        self._execute(_update_sql("lots", "lot_id", tuple(updates)), (*updates.values(), lot_id))
 
     def list_lots(
         self,
         *,
         symbol: str | None = None,
         only_open: bool = False,
+        threshold_until: date | None = None,
     ) -> list[dict[str, Any]]:
         query = "SELECT * FROM lots"
         clauses: list[str] = []
@@ -136,6 +353,12 @@ class SQLiteRepository(BaseRepository):
             params.append(symbol)
         if only_open:
             clauses.append("qty_remaining > 0")
+        if threshold_until is not None:
+            # threshold_date is stored as a local ISO timestamp, so "on or before
+            # day D" is the same as sorting before the bare date string D + 1.
+            # A plain range comparison keeps idx_lots_open_threshold usable.
+            clauses.append("threshold_date < ?")
+            params.append((threshold_until + timedelta(days=1)).isoformat())
         if clauses:
             query += " WHERE " + " AND ".join(clauses)
         query += " ORDER BY acquired_at ASC, lot_id ASC;"
@@ -144,44 +367,39 @@ class SQLiteRepository(BaseRepository):
     def delete_lot(self, lot_id: int) -> None:
         self._execute("DELETE FROM lots WHERE lot_id = ?;", (lot_id,))
 
+    def truncate_lots(self) -> None:
+        self._execute("DELETE FROM lots;")
+
     def aggregate_open_lots(self) -> list[dict[str, Any]]:
-        rows = self._fetchall(
+        # TOTAL() is SUM() that always yields a float and treats NULL as 0.0,
+        # so the rows come back in their final shape.
+        return self._fetchall(
             """
             SELECT symbol,
-                   SUM(qty_remaining) AS total_qty,
-                   SUM(cost_base_total) AS total_cost
+                   TOTAL(qty_remaining) AS total_qty,
+                   TOTAL(cost_base_total) AS total_cost
             FROM lots
             WHERE qty_remaining > 0
             GROUP BY symbol
             ORDER BY symbol ASC;
             """
         )
-        aggregates: list[dict[str, Any]] = []
-        for row in rows:
-            aggregates.append(
-                {
-                    "symbol": row["symbol"],
-                    "total_qty": float(row.get("total_qty") or 0.0),
-                    "total_cost": float(row.get("total_cost") or 0.0),
-                }
-            )
-        return aggregates
 
     # --- disposals -----------------------------------------------------
     def add_disposal(self, disposal: Mapping[str, Any]) -> int:
-        columns = ", ".join(disposal.keys())
-        placeholders = ", ".join(["?"] * len(disposal))
-        cur = self._execute(
-            f"INSERT INTO disposals ({columns}) VALUES ({placeholders});",
-            tuple(disposal.values()),
-        )
+        cur = self._execute(_insert_sql("disposals", tuple(disposal)), tuple(disposal.values()))
         return int(cur.lastrowid)
 
+    def add_disposals(self, disposals: Iterable[Mapping[str, Any]]) -> None:
+        self._insert_many("disposals", list(disposals))
+
     def list_disposals(
         self,
         *,
         sell_txn_id: int | None = None,
         lot_id: int | None = None,
+        sell_txn_ids: Iterable[int] | None = None,
+        lot_ids: Iterable[int] | None = None,
     ) -> list[dict[str, Any]]:
         query = "SELECT * FROM disposals"
         clauses: list[str] = []
@@ -192,6 +410,15 @@ class SQLiteRepository(BaseRepository):
         if lot_id is not None:
             clauses.append("lot_id = ?")
             params.append(lot_id)
+        if sell_txn_ids is not None and lot_ids is not None:
+            raise RepositoryError("Filter disposals by sell_txn_ids or lot_ids, not both")
+        if sell_txn_ids is not None or lot_ids is not None:
+            column = "sell_txn_id" if sell_txn_ids is not None else "lot_id"
+            values = set(sell_txn_ids if sell_txn_ids is not None else lot_ids)
+            rows = self._fetch_in(query, clauses, params, column, values, "id ASC")
+            if len(values) > _IN_CHUNK_SIZE:
+                rows.sort(key=itemgetter("id"))
+            return rows
         if clauses:
             query += " WHERE " + " AND ".join(clauses)
         query += " ORDER BY id ASC;"
@@ -200,51 +427,79 @@ class SQLiteRepository(BaseRepository):
     def delete_disposals_for_sell(self, sell_txn_id: int) -> None:
         self._execute("DELETE FROM disposals WHERE sell_txn_id = ?;", (sell_txn_id,))
 
+    def truncate_disposals(self) -> None:
+        self._execute("DELETE FROM disposals;")
+
     # --- price cache ---------------------------------------------------
     def upsert_price(self, record: Mapping[str, Any]) -> None:
-        columns = list(record.keys())
-        placeholders = ", ".join(["?"] * len(columns))
-        assignments = ", ".join(f"{col} = excluded.{col}" for col in columns if col != "symbol")
-        self._execute(
-            f"""
-            INSERT INTO price_cache ({', '.join(columns)})
-            VALUES ({placeholders})
-            ON CONFLICT(symbol) DO UPDATE SET {assignments};
-            """,
-            tuple(record[col] for col in columns),
-        )
+        columns = tuple(record)
+        self._execute(_upsert_price_sql(columns), tuple(record[col] for col in columns))
+        self._price_rows.pop(record["symbol"], None)
+
+    def upsert_prices(self, records: Iterable[Mapping[str, Any]]) -> None:
+        rows = list(records)
+        if not rows:
+            return
+        with self.batch():
+            for columns, params in _column_runs(rows):
+                self._executemany(_upsert_price_sql(columns), params)
+        for row in rows:
+            self._price_rows.pop(row["symbol"], None)
 
     def get_prices(self, symbols: Iterable[str]) -> dict[str, dict[str, Any]]:
-        sym_list = list(symbols)
-        if not sym_list:
-            return {}
-        placeholders = ", ".join(["?"] * len(sym_list))
-        rows = self._fetchall(
-            f"SELECT * FROM price_cache WHERE symbol IN ({placeholders});",
-            tuple(sym_list),
-        )
-        return {row["symbol"]: row for row in rows}
+        # Quotes are read far more often than refreshed, so rows are cached
+        # per symbol. Our own writes evict their symbols; a commit from any
+        # other connection moves PRAGMA data_version and drops the cache.
+        external = self._conn.execute("PRAGMA data_version;").fetchone()[0]
+        if external != self._price_rows_version:
+            self._price_rows.clear()
+            self._price_rows_version = external
+        cache = self._price_rows
+        wanted = set(symbols)
+        missing = [symbol for symbol in wanted if symbol not in cache]
+        if missing:
+            rows = self._fetch_in(
+                "SELECT * FROM price_cache", [], [], "symbol", missing, "symbol ASC"
+            )
+            found = {row["symbol"]: row for row in rows}
+            for symbol in missing:
+                cache[symbol] = found.get(symbol)
+        return {
+            symbol: dict(row)
+            for symbol in wanted
+            if (row := cache[symbol]) is not None
+        }
 
     def purge_price(self, symbol: str) -> None:
         self._execute("DELETE FROM price_cache WHERE symbol = ?;", (symbol,))
+        self._price_rows.pop(symbol, None)
 
     # --- actionables ---------------------------------------------------
     def add_actionable(self, actionable: Mapping[str, Any]) -> int:
-        columns = ", ".join(actionable.keys())
-        placeholders = ", ".join(["?"] * len(actionable))
         cur = self._execute(
-            f"INSERT INTO actionables ({columns}) VALUES ({placeholders});",
-            tuple(actionable.values()),
+            _insert_sql("actionables", tuple(actionable)), tuple(actionable.values())
         )
         return int(cur.lastrowid)
 
     def update_actionable(self, actionable_id: int, updates: Mapping[str, Any]) -> None:
-        assignments = ", ".join(f"{k} = ?" for k in updates)
-        params = list(updates.values()) + [actionable_id]
         self._execute(
-            f"UPDATE actionables SET {assignments} WHERE id = ?;", tuple(params)
+            _update_sql("actionables", "id", tuple(updates)), (*updates.values(), actionable_id)
         )
 
+    def update_actionables(
+        self, actionable_ids: Iterable[int], updates: Mapping[str, Any]
+    ) -> None:
+        ids = list(actionable_ids)
+        assignments = ", ".join(f"{k} = ?" for k in updates)
+        with self.batch():
+            for start in range(0, len(ids), _IN_CHUNK_SIZE):
+                chunk = ids[start : start + _IN_CHUNK_SIZE]
+                placeholders = ", ".join(["?"] * len(chunk))
+                self._execute(
+                    f"UPDATE actionables SET {assignments} WHERE id IN ({placeholders});",
+                    tuple(updates.values()) + tuple(chunk),
+                )
+
     def list_actionables(
         self,
         *,
@@ -26,7 +26,10 @@ class ManualInlineProvider:
     def set_quote(self, symbol: str, price: float, asof: datetime | None = None) -> None:
         """Update the manual quote cache for *symbol*."""
 
-        asof = (asof or datetime.now(tz=self._tz)).astimezone(self._tz)
+        if asof is None:
+            asof = datetime.now(tz=self._tz)
+        elif asof.tzinfo is not self._tz:
+            asof = asof.astimezone(self._tz)
         self._quotes[symbol] = ProviderPrice(
             symbol=symbol,
             price=float(price),
@@ -1,7 +1,9 @@
 """HTTP-powered pricing provider using the Yahoo Finance quote endpoint."""
 from __future__ import annotations
 
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from typing import Callable, Iterable
 
@@ -22,26 +24,68 @@ class OnlineDefaultProvider:
         base_url: str = "https://query1.finance.yahoo.com/v7/finance/quote",
         retries: int = 2,
         backoff_seconds: float = 0.5,
+        batch_size: int = 50,
+        max_concurrency: int = 4,
     ) -> None:
-        self._client_factory = client_factory or (lambda: httpx.Client(timeout=5.0))
+        self._client_factory = client_factory or _default_client
         self._base_url = base_url
         self._retries = max(retries, 0)
         self._backoff = max(backoff_seconds, 0.0)
+        self._batch_size = max(batch_size, 1)
+        self._max_concurrency = max(max_concurrency, 1)
+        # One pooled client per provider keeps connections (and TLS sessions)
+        # alive across batches and refreshes instead of re-handshaking each call.
+        self._client: httpx.Client | None = None
+        self._client_lock = threading.Lock()
+
+    def close(self) -> None:
+        """Release the pooled HTTP client, if one was opened."""
+
+        with self._client_lock:
+            client, self._client = self._client, None
+        if client is not None:
+            close = getattr(client, "close", None)
+            if close is not None:
+                close()
+
+    def _get_client(self) -> httpx.Client:
+        client = self._client
+        if client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self._client_factory()
+                client = self._client
+        return client
 
     def fetch(self, symbols: Iterable[str]) -> dict[str, ProviderPrice]:
         symbols_list = [symbol for symbol in symbols if symbol]
         if not symbols_list:
             return {}
+        batches = [
+            symbols_list[idx : idx + self._batch_size]
+            for idx in range(0, len(symbols_list), self._batch_size)
+        ]
+        if len(batches) == 1:
+            return self._fetch_batch(batches[0])
+        # Large refreshes are split into several requests; issue them
+        # concurrently so wall-clock time tracks the slowest batch, not the sum.
+        quotes: dict[str, ProviderPrice] = {}
+        workers = min(self._max_concurrency, len(batches))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for result in pool.map(self._fetch_batch, batches):
+                quotes.update(result)
+        return quotes
+
+    def _fetch_batch(self, symbols_list: list[str]) -> dict[str, ProviderPrice]:
         params = {"symbols": ",".join(symbols_list)}
         attempt = 0
         last_exc: Exception | None = None
         while attempt <= self._retries:
             try:
-                with self._client_factory() as client:
-                    response = client.get(self._base_url, params=params)
-                    response.raise_for_status()
-                    data = response.json()
-                    return self._parse_response(data)
+                response = self._get_client().get(self._base_url, params=params)
+                response.raise_for_status()
+                data = response.json()
+                return self._parse_response(data)
             except Exception as exc:  # pragma: no cover - defensive loop
                 last_exc = exc
                 attempt += 1
@@ -71,6 +115,13 @@ class OnlineDefaultProvider:
         return quotes
 
 
+def _default_client() -> httpx.Client:
+    return httpx.Client(
+        timeout=5.0,
+        limits=httpx.Limits(max_keepalive_connections=8),
+    )
+
+
 def _timestamp_to_datetime(value: int | float) -> datetime:
     return datetime.fromtimestamp(float(value), tz=timezone.utc)
 
@@ -36,14 +36,23 @@ def cgt_window_rule(ctx: RuleContext) -> Iterable[ActionableCandidate]:
 def weight_rules(ctx: RuleContext) -> Iterable[ActionableCandidate]:
     band = float(ctx.thresholds.get("overweight_band", 0.02))
     concentration_limit = float(ctx.thresholds.get("concentration_limit", 0.25))
+    # Most portfolios set no targets; then only the concentration check applies
+    # and positions below the limit can be skipped without further work.
+    targets = ctx.target_weights
     results: List[ActionableCandidate] = []
     for row in ctx.positions:
-        symbol = str(row.get("symbol"))
-        weight_pct = row.get("weight_pct")
-        if symbol == "TOTAL" or weight_pct is None:
+        get = row.get
+        weight_pct = get("weight_pct")
+        if weight_pct is None:
             continue
-        target = ctx.target_weights.get(symbol.upper())
         weight = float(weight_pct) / 100.0
+        if not targets and weight <= concentration_limit:
+            continue
+        symbol = str(get("symbol"))
+        if symbol == "TOTAL":
+            continue
+        key = symbol.upper()
+        target = targets.get(key) if targets else None
         if target is not None:
             if weight > target + band:
                 message = (
@@ -54,7 +63,7 @@ def weight_rules(ctx: RuleContext) -> Iterable[ActionableCandidate]:
                         type="OVERWEIGHT",
                         symbol=symbol,
                         message=message,
-                        context=f"target:{symbol.upper()}",
+                        context=f"target:{key}",
                     )
                 )
             elif weight < target - band:
@@ -66,7 +75,7 @@ def weight_rules(ctx: RuleContext) -> Iterable[ActionableCandidate]:
                         type="UNDERWEIGHT",
                         symbol=symbol,
                         message=message,
-                        context=f"target:{symbol.upper()}",
+                        context=f"target:{key}",
                     )
                 )
         if weight > concentration_limit:
@@ -77,7 +86,7 @@ def weight_rules(ctx: RuleContext) -> Iterable[ActionableCandidate]:
                     message=(
                         f"{symbol} concentration {weight:.2%} exceeds limit {concentration_limit:.2%}"
                     ),
-                    context=f"concentration:{symbol.upper()}",
+                    context=f"concentration:{key}",
                 )
             )
     return results
@@ -89,13 +98,10 @@ def trailing_stop_rule(ctx: RuleContext) -> Iterable[ActionableCandidate]:
         symbol = str(row.get("symbol"))
         if symbol == "TOTAL":
             continue
-        transactions = ctx.transactions.get(symbol, [])
-        has_stop = False
-        for txn in transactions:
-            notes = str(txn.get("notes") or "").lower()
-            if "stop" in notes:
-                has_stop = True
-                break
+        has_stop = any(
+            "stop" in str(txn.get("notes") or "").lower()
+            for txn in ctx.transactions.get(symbol, ())
+        )
         if not has_stop:
             results.append(
                 ActionableCandidate(
@@ -112,13 +118,14 @@ def unrealised_loss_rule(ctx: RuleContext) -> Iterable[ActionableCandidate]:
     threshold = float(ctx.thresholds.get("loss_threshold_pct", -0.15))
     results: List[ActionableCandidate] = []
     for row in ctx.positions:
-        symbol = str(row.get("symbol"))
-        if symbol == "TOTAL":
-            continue
-        cost_base = row.get("cost_base")
-        market_value = row.get("market_value")
+        get = row.get
+        cost_base = get("cost_base")
+        market_value = get("market_value")
         if not cost_base or not market_value:
             continue
+        symbol = str(get("symbol"))
+        if symbol == "TOTAL":
+            continue
         cost = float(cost_base)
         mv = float(market_value)
         if cost <= 0:
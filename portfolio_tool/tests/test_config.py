@@ -0,0 +1,12 @@
+from portfolio_tool.core.config import load_config
+
+
+def test_load_config_reparses_after_file_change(tmp_path):
+    path = tmp_path / "config.toml"
+    path.write_text('timezone = "UTC"\n', encoding="utf-8")
+    first = load_config(path)
+    first["timezone"] = "mutated"
+    assert load_config(path)["timezone"] == "UTC"
+
+    path.write_text('timezone = "Australia/Perth"\n', encoding="utf-8")
+    assert load_config(path)["timezone"] == "Australia/Perth"
@@ -59,3 +59,12 @@ def test_match_raises_on_insufficient_quantity():
     lots = [make_lot(1, datetime(2023, 1, 1, tzinfo=TZ), 100, 1000)]
     with pytest.raises(LotMatchingError):
         match_disposal(lots, 150, "FIFO", None)
+
+
+def test_match_fifo_sorts_unordered_input():
+    lots = [
+        make_lot(2, datetime(2023, 2, 1, tzinfo=TZ), 200, 2200),
+        make_lot(1, datetime(2023, 1, 1, tzinfo=TZ), 100, 1000),
+    ]
+    matches = match_disposal(lots, 150, "FIFO", None)
+    assert [(lot.lot_id, qty) for lot, qty in matches] == [(1, 100.0), (2, 50.0)]
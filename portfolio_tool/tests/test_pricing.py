@@ -147,3 +147,217 @@ def test_positions_without_prices_show_none(tmp_path):
     positions = service.compute_positions(prices={})
     assert positions[0].mv is None
     repo.close()
+
+
+def test_get_quotes_refresh_falls_back_to_cached_manual(tmp_path):
+    tz = ZoneInfo("Australia/Brisbane")
+    provider = DummyProvider(210.0, tz=tz)
+    now = [aware(2024, 1, 1, 10, 30)]
+    repo, service = _service(tmp_path, provider, now)
+    service.set_manual("CSL", 305.5, aware(2024, 1, 1, 10, 0))
+
+    quotes = service.get_quotes(["CSL", "IOZ"], refresh=True)
+    assert quotes["CSL"].price == pytest.approx(305.5)
+    assert quotes["CSL"].source == "manual"
+    assert quotes["IOZ"].price == pytest.approx(210.0)
+    repo.close()
+
+
+def test_get_quotes_stale_while_revalidate(tmp_path):
+    tz = ZoneInfo("Australia/Brisbane")
+    provider = DummyProvider(200.0, tz=tz)
+    now = [aware(2024, 1, 1, 10, 30)]
+    repo, service = _service(tmp_path, provider, now)
+    service.refresh_prices(["CSL"])
+
+    provider.price = 220.0
+    provider.asof = aware(2024, 1, 1, 12, 0)
+    now[0] = aware(2024, 1, 1, 12, 5)
+    quotes = service.get_quotes(["CSL"], refresh=True, stale_while_revalidate=True)
+    assert quotes["CSL"].price == pytest.approx(200.0)
+    assert quotes["CSL"].stale is True
+
+    refreshed = service.apply_revalidation(wait=True)
+    assert refreshed["CSL"].price == pytest.approx(220.0)
+    assert service.get_cached(["CSL"])["CSL"].price == pytest.approx(220.0)
+    repo.close()
+
+
+def test_revalidation_keeps_manual_override_set_meanwhile(tmp_path):
+    tz = ZoneInfo("Australia/Brisbane")
+    provider = DummyProvider(1.0, tz=tz)
+    now = [aware(2024, 1, 1, 12, 5)]
+    repo, service = _service(tmp_path, provider, now)
+    service.get_quotes(["CSL", "BHP"], refresh=True, stale_while_revalidate=True)
+    service.set_manual("CSL", 99.0, None)
+    refreshed = service.apply_revalidation(wait=True)
+    assert sorted(refreshed) == ["BHP"]
+    quote = service.get_cached(["CSL"])["CSL"]
+    assert (quote.price, quote.source) == (pytest.approx(99.0), "manual")
+    service.close()
+    repo.close()
+
+
+def test_close_persists_pending_revalidation(tmp_path, caplog):
+    tz = ZoneInfo("Australia/Brisbane")
+    provider = DummyProvider(200.0, tz=tz)
+    now = [aware(2024, 1, 1, 12, 5)]
+    repo, service = _service(tmp_path, provider, now)
+    service.get_quotes(["CSL"], refresh=True, stale_while_revalidate=True)
+    service.close()
+    assert service.get_cached(["CSL"])["CSL"].price == pytest.approx(200.0)
+
+    def failing_fetch(symbols):
+        raise RuntimeError("provider down")
+
+    provider.fetch = failing_fetch
+    now[0] = aware(2024, 1, 2, 12, 5)
+    service.get_quotes(["CSL"], refresh=True, stale_while_revalidate=True)
+    service.close()
+    assert "Background price refresh failed" in caplog.text
+    assert service.get_cached(["CSL"])["CSL"].price == pytest.approx(200.0)
+    repo.close()
+
+
+def test_adaptive_ttl_tracks_quote_volatility(tmp_path):
+    tz = ZoneInfo("Australia/Brisbane")
+    provider = DummyProvider(100.0, tz=tz)
+    now = [aware(2024, 1, 1, 10, 0)]
+    repo = JSONRepository(tmp_path / "adaptive.json")
+    service = PricingService(
+        repo,
+        provider,
+        cache_ttl_minutes=15,
+        stale_price_max_minutes=24 * 60,
+        timezone="Australia/Brisbane",
+        adaptive_ttl=True,
+        target_volatility=0.01,
+        now_fn=lambda: now[0],
+    )
+    service.refresh_prices(["CSL"])
+    provider.price = 100.1  # 0.1% move, well below the 1% target
+    service.refresh_prices(["CSL"])
+    row = repo.get_prices(["CSL"])["CSL"]
+    assert row["volatility_ewma"] == pytest.approx(0.001)
+    assert row["effective_ttl_seconds"] == pytest.approx(15 * 60 * 10)
+
+    now[0] = now[0] + timedelta(minutes=60)
+    assert service.get_cached(["CSL"])["CSL"].stale is False
+    repo.close()
+
+
+def test_refresh_applies_exchange_suffix(tmp_path):
+    tz = ZoneInfo("Australia/Brisbane")
+    provider = DummyProvider(250.0, tz=tz)
+    requested = []
+    original_fetch = provider.fetch
+    provider.fetch = lambda symbols: requested.append(list(symbols)) or original_fetch(symbols)
+    repo = JSONRepository(tmp_path / "suffix.json")
+    PortfolioService(repo).record_trade(
+        Transaction(
+            dt=aware(2024, 1, 1, 10, 0),
+            type="BUY",
+            symbol="CSL",
+            qty=5.0,
+            price=100.0,
+            exchange="asx",
+        )
+    )
+    service = PricingService(
+        repo,
+        provider,
+        exchange_suffix_map={"ASX": ".AX"},
+        now_fn=lambda: aware(2024, 1, 1, 11, 0),
+    )
+    service.refresh_prices(["CSL", "IOZ"])
+    service.refresh_prices(["CSL"])
+    assert requested == [["CSL.AX", "IOZ"], ["CSL.AX"]]
+    repo.close()
+
+
+def test_online_default_provider_splits_large_requests():
+    requested = []
+
+    class EchoClient:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, exc_type, exc, tb):
+            return False
+
+        def get(self, url, params=None):
+            symbols = params["symbols"].split(",")
+            requested.append(symbols)
+
+            class EchoResponse:
+                def raise_for_status(self):
+                    return None
+
+                def json(self):
+                    return {
+                        "quoteResponse": {
+                            "result": [
+                                {
+                                    "symbol": symbol,
+                                    "regularMarketPrice": 1.0,
+                                    "regularMarketTime": 1700000000,
+                                }
+                                for symbol in symbols
+                            ]
+                        }
+                    }
+
+            return EchoResponse()
+
+    provider = OnlineDefaultProvider(client_factory=EchoClient, batch_size=2)
+    quotes = provider.fetch(["A", "B", "C", "D", "E"])
+    assert sorted(quotes) == ["A", "B", "C", "D", "E"]
+    assert sorted(len(batch) for batch in requested) == [1, 2, 2]
+
+
+def test_online_default_provider_reuses_client(tmp_path):
+    created = []
+
+    class PooledClient:
+        def __init__(self):
+            self.closed = False
+            created.append(self)
+
+        def close(self):
+            self.closed = True
+
+        def get(self, url, params=None):
+            symbols = params["symbols"].split(",")
+
+            class PooledResponse:
+                def raise_for_status(self):
+                    return None
+
+                def json(self):
+                    return {
+                        "quoteResponse": {
+                            "result": [
+                                {
+                                    "symbol": symbol,
+                                    "regularMarketPrice": 2.0,
+                                    "regularMarketTime": 1700000000,
+                                }
+                                for symbol in symbols
+                            ]
+                        }
+                    }
+
+            return PooledResponse()
+
+    provider = OnlineDefaultProvider(client_factory=PooledClient, batch_size=1)
+    provider.fetch(["A", "B", "C"])
+    provider.fetch(["D"])
+    assert len(created) == 1
+    provider.close()
+    assert created[0].closed
+
+    provider.fetch(["E"])
+    service = PricingService(JSONRepository(tmp_path / "close.json"), provider)
+    service.close()
+    assert len(created) == 2 and created[1].closed
+    service.repo.close()
@@ -162,3 +162,37 @@ def test_cgt_calendar_matches_golden(tmp_path):
     md_text = md_renderer.render(cgt, CGT_FIELDS)
     assert csv_text == (GOLDEN_DIR / "cgt_calendar.csv").read_text()
     assert md_text == (GOLDEN_DIR / "cgt_calendar.md").read_text()
+
+
+def test_trade_audit_log_streams_in_order(tmp_path):
+    build_sample(tmp_path)
+    reporting = ReportingService(JSONRepository(tmp_path / "sample.json"))
+    rows = reporting.trade_audit_log()
+    assert rows == list(reporting.iter_trade_audit_log())
+    assert rows == list(reporting.iter_trade_audit_log(page_size=1))
+    assert [row["type"] for row in rows] == ["BUY", "BUY", "SELL", "BUY"]
+    assert rows[2]["cost_base"] is not None
+    assert rows[0]["gain_loss"] is None
+
+
+def test_positions_snapshot_reuses_rows_until_data_changes(tmp_path):
+    build_sample(tmp_path)
+    repo = JSONRepository(tmp_path / "sample.json")
+    portfolio = PortfolioService(repo)
+    reporting = ReportingService(repo, portfolio_service=portfolio)
+    calls = []
+    compute = portfolio.compute_positions
+    portfolio.compute_positions = lambda **kw: calls.append(kw) or compute(**kw)
+
+    first = reporting.positions_snapshot(aware(2024, 6, 20), {})
+    second = reporting.positions_snapshot(aware(2024, 6, 21), {})
+    assert len(calls) == 1
+    assert second[0]["report_asof"] == aware(2024, 6, 21)
+    assert [row["quantity"] for row in first] == [row["quantity"] for row in second]
+
+    portfolio.record_trade(
+        Transaction(dt=aware(2024, 6, 21, 10), type="BUY", symbol="IOZ", qty=10, price=31.0)
+    )
+    third = reporting.positions_snapshot(aware(2024, 6, 21), {})
+    assert len(calls) == 2
+    assert third[-1]["quantity"] == second[-1]["quantity"] + 10
@@ -1,12 +1,12 @@
 from __future__ import annotations
 
 import sqlite3
-from datetime import datetime
+from datetime import date, datetime
 
 import pytest
 from zoneinfo import ZoneInfo
 
-from portfolio_tool.data import JSONRepository, SQLiteRepository
+from portfolio_tool.data import JSONRepository, RepositoryError, SQLiteRepository
 
 _TZ = ZoneInfo("Australia/Brisbane")
 
@@ -104,6 +104,60 @@ def test_list_transactions_order(repo):
     assert rows[0]["symbol"] == "BHP"
     rows_symbol = repo.list_transactions(symbol="CSL")
     assert all(row["symbol"] == "CSL" for row in rows_symbol)
+    third = repo.add_transaction(_sample_txn("IOZ"))
+    rows = repo.list_transactions(symbols=["BHP", "IOZ", "VAS"], order="desc")
+    assert [row["symbol"] for row in rows] == ["BHP", "IOZ"]
+    page = repo.list_transactions(symbols=["IOZ", "CSL"], limit=1, offset=1)
+    assert [row["id"] for row in page] == [third]
+    assert repo.list_transactions(symbols=[]) == []
+    assert repo.list_transactions(symbol="CSL", symbols=["BHP"]) == []
+
+
+def test_symbol_filters_follow_updates_and_deletes(repo):
+    first = repo.add_transaction(_sample_txn("CSL"))
+    second = repo.add_transaction(_sample_txn("CSL"))
+    repo.update_transaction(second, {"symbol": "BHP"})
+    repo.delete_transaction(first)
+    assert repo.list_transactions(symbol="CSL") == []
+    assert [row["id"] for row in repo.list_transactions(symbol="BHP")] == [second]
+
+    lot_id = repo.add_lot(_sample_lot("IOZ"))
+    repo.add_lot(_sample_lot("CSL"))
+    repo.delete_lot(lot_id)
+    assert repo.list_lots(symbol="IOZ") == []
+    assert len(repo.list_lots(symbol="CSL")) == 1
+
+
+def test_iter_transactions_pages_in_order(repo):
+    later = _sample_txn("CSL") | {"dt": datetime(2024, 3, 1, 10, 0, tzinfo=_TZ).isoformat()}
+    ids = [repo.add_transaction(later)]
+    ids += [repo.add_transaction(_sample_txn(symbol)) for symbol in ("BHP", "IOZ")]
+    rows = list(repo.iter_transactions(batch_size=2))
+    assert [row["id"] for row in rows] == ids[1:] + ids[:1]
+
+
+def test_get_latest_exchanges(repo):
+    repo.add_transaction(_sample_txn("CSL"))
+    later = _sample_txn("CSL") | {
+        "dt": datetime(2024, 2, 1, 10, 0, tzinfo=_TZ).isoformat(),
+        "exchange": "CHIX",
+    }
+    repo.add_transaction(later)
+    repo.add_transaction(_sample_txn("BHP"))
+    exchanges = repo.get_latest_exchanges(["CSL", "BHP", "IOZ"])
+    assert exchanges == {"CSL": "CHIX", "BHP": "ASX"}
+
+
+def test_sqlite_bulk_lookups_respect_variable_limit(tmp_path):
+    repo = SQLiteRepository(tmp_path / "limit.sqlite")
+    try:
+        # SQLite's historical default; newer builds allow more.
+        repo._conn.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 999)
+        repo.add_transaction(_sample_txn("CSL"))
+        many = [f"S{idx:04d}" for idx in range(1200)] + ["CSL"]
+        assert repo.get_latest_exchanges(many) == {"CSL": "ASX"}
+    finally:
+        repo.close()
 
 
 def test_lot_and_disposal_roundtrip(repo):
@@ -123,6 +177,98 @@ def test_lot_and_disposal_roundtrip(repo):
     assert repo.list_disposals(lot_id=lot_id) == []
 
 
+def test_list_lots_threshold_until(repo):
+    due = repo.add_lot(_sample_lot("CSL"))
+    later = _sample_lot("BHP") | {
+        "threshold_date": datetime(2025, 3, 1, 0, 0, tzinfo=_TZ).isoformat()
+    }
+    repo.add_lot(later)
+    rows = repo.list_lots(only_open=True, threshold_until=date(2025, 1, 2))
+    assert [row["lot_id"] for row in rows] == [due]
+    assert repo.list_lots(threshold_until=date(2025, 1, 1)) == []
+
+
+def test_truncate_lots_and_disposals(repo):
+    lot_id = repo.add_lot(_sample_lot())
+    repo.add_lot(_sample_lot("BHP"))
+    repo.add_disposals([_sample_disposal(lot_id), _sample_disposal(lot_id, sell_txn_id=3)])
+    repo.truncate_lots()
+    repo.truncate_disposals()
+    assert repo.list_lots() == []
+    assert repo.list_disposals() == []
+
+
+def test_add_disposals_bulk(repo):
+    lot_id = repo.add_lot(_sample_lot())
+    repo.add_disposals(
+        [_sample_disposal(lot_id), _sample_disposal(lot_id) | {"qty": 2.0}]
+    )
+    rows = repo.list_disposals(lot_id=lot_id)
+    assert [row["qty"] for row in rows] == [5.0, 2.0]
+    assert rows[0]["id"] < rows[1]["id"]
+
+
+def test_add_transactions_and_lots_bulk(repo):
+    first = repo.add_transaction(_sample_txn("CSL"))
+    txn_ids = repo.add_transactions([_sample_txn(symbol) for symbol in ("BHP", "IOZ", "VAS")])
+    assert txn_ids == [first + 1, first + 2, first + 3]
+    assert repo.get_transaction(txn_ids[-1])["symbol"] == "VAS"
+    assert repo.add_transactions([]) == []
+
+    lot_ids = repo.add_lots([_sample_lot("CSL"), _sample_lot("BHP")])
+    rows = {row["lot_id"]: row["symbol"] for row in repo.list_lots()}
+    assert rows == {lot_ids[0]: "CSL", lot_ids[1]: "BHP"}
+
+
+def test_bulk_inserts_keep_columns_from_every_row(repo):
+    bare = _sample_txn()
+    del bare["notes"], bare["exchange"]
+    ids = repo.add_transactions([bare, _sample_txn("BHP"), bare | {"symbol": "IOZ"}])
+    rows = repo.get_transactions(ids)
+    assert [rows[txn_id]["symbol"] for txn_id in ids] == ["CSL", "BHP", "IOZ"]
+    assert rows[ids[1]]["notes"] == "unit test"
+    assert rows[ids[1]]["exchange"] == "ASX"
+    assert rows[ids[2]].get("notes") is None
+
+
+def test_data_version_changes_on_write(repo):
+    before = repo.data_version()
+    repo.list_lots()
+    assert repo.data_version() == before
+    repo.add_lot(_sample_lot())
+    assert repo.data_version() != before
+
+    # A token seen inside a batch must not come back once it rolls back.
+    with pytest.raises(RuntimeError):
+        with repo.batch():
+            repo.add_lot(_sample_lot("BHP"))
+            inside = repo.data_version()
+            raise RuntimeError("abort")
+    assert repo.data_version() != inside
+
+
+def test_bulk_lookups_by_id(repo):
+    first = repo.add_transaction(_sample_txn("CSL"))
+    second = repo.add_transaction(_sample_txn("BHP"))
+    txns = repo.get_transactions([first, second, 999])
+    assert set(txns) == {first, second}
+    assert txns[second]["symbol"] == "BHP"
+
+    lot_a = repo.add_lot(_sample_lot("CSL"))
+    lot_b = repo.add_lot(_sample_lot("BHP"))
+    repo.add_disposals(
+        [
+            _sample_disposal(lot_a, sell_txn_id=10),
+            _sample_disposal(lot_b, sell_txn_id=11),
+            _sample_disposal(lot_b, sell_txn_id=12),
+        ]
+    )
+    assert {row["lot_id"] for row in repo.list_disposals(lot_ids=[lot_b])} == {lot_b}
+    by_sell = repo.list_disposals(sell_txn_ids=[10, 12])
+    assert [row["sell_txn_id"] for row in by_sell] == [10, 12]
+    assert repo.list_disposals(lot_ids=[]) == []
+
+
 def test_aggregate_open_lots(repo):
     lot_a = _sample_lot("CSL")
     lot_a.update({"qty_remaining": 10.0, "cost_base_total": 1000.0})
@@ -153,6 +299,117 @@ def test_price_cache_roundtrip(repo):
     assert repo.get_prices(["CSL"]) == {}
 
 
+def test_batch_flushes_writes_on_exit(tmp_path, repo):
+    with repo.batch():
+        lot_id = repo.add_lot(_sample_lot())
+        repo.update_lot(lot_id, {"qty_remaining": 4.0})
+        repo.add_disposal(_sample_disposal(lot_id))
+
+    reopened = type(repo)(repo.path)
+    try:
+        assert reopened.list_lots()[0]["qty_remaining"] == 4.0
+        assert len(reopened.list_disposals(lot_id=lot_id)) == 1
+    finally:
+        reopened.close()
+
+
+def test_batch_discards_writes_on_error(tmp_path, repo):
+    txn_id = repo.add_transaction(_sample_txn())
+    lot_id = repo.add_lot(_sample_lot())
+
+    with pytest.raises(RuntimeError):
+        with repo.batch():
+            repo.add_transaction(_sample_txn("IOZ"))
+            with repo.batch():
+                repo.update_lot(lot_id, {"qty_remaining": 4.0})
+                repo.add_disposal(_sample_disposal(lot_id))
+            repo.delete_transaction(txn_id)
+            raise RuntimeError("abort")
+
+    def check(instance):
+        assert [row["id"] for row in instance.list_transactions()] == [txn_id]
+        assert instance.list_transactions(symbol="IOZ") == []
+        assert instance.list_lots()[0]["qty_remaining"] == 10.0
+        assert instance.list_disposals() == []
+
+    check(repo)
+    repo.add_transaction(_sample_txn("VAS"))
+    reopened = type(repo)(repo.path)
+    try:
+        assert [row["symbol"] for row in reopened.list_transactions()] == ["CSL", "VAS"]
+        assert reopened.list_lots()[0]["qty_remaining"] == 10.0
+        assert reopened.list_disposals() == []
+    finally:
+        reopened.close()
+    repo.delete_transaction(repo.list_transactions(symbol="VAS")[0]["id"])
+    check(repo)
+
+
+def test_batch_reverts_write_that_fails_before_logging(repo):
+    broken = _sample_txn()
+    del broken["symbol"]
+    with pytest.raises((KeyError, RepositoryError)):
+        with repo.batch():
+            repo.add_transaction(broken)
+    assert repo.list_transactions() == []
+    # The id consumed by the failed insert is handed out again.
+    assert repo.add_transaction(_sample_txn()) == 1
+
+
+def test_json_appends_log_and_replays_without_close(tmp_path):
+    path = tmp_path / "logged.json"
+    repo = JSONRepository(path)
+    txn_id = repo.add_transaction(_sample_txn())
+    lot_id = repo.add_lot(_sample_lot())
+    snapshot = path.read_text()
+    repo.update_lot(lot_id, {"qty_remaining": 4.0})
+    repo.add_disposal(_sample_disposal(lot_id))
+    # Small writes are appended to the log; the snapshot is left alone.
+    assert path.read_text() == snapshot
+    assert repo.log_path.read_text().count("\n") == 2
+
+    # Simulate a crash: reopen without closing the first instance.
+    reopened = JSONRepository(path)
+    try:
+        assert reopened.list_lots()[0]["qty_remaining"] == 4.0
+        assert len(reopened.list_disposals(lot_id=lot_id)) == 1
+        assert reopened.add_transaction(_sample_txn()) == txn_id + 1
+    finally:
+        reopened.close()
+    assert reopened.log_path.read_text() == ""
+    assert len(JSONRepository(path).list_transactions()) == 2
+
+
+def test_upsert_prices_bulk(repo):
+    repo.upsert_price(_sample_price("CSL"))
+    repo.upsert_prices(
+        [_sample_price("CSL") | {"price": 261.0}, _sample_price("IOZ") | {"price": 31.5}]
+    )
+    prices = repo.get_prices(["CSL", "IOZ"])
+    assert prices["CSL"]["price"] == 261.0
+    assert prices["IOZ"]["price"] == 31.5
+
+
+def test_upsert_prices_keeps_columns_from_every_row(repo):
+    plain = _sample_price("CSL")
+    tracked = _sample_price("BHP") | {"volatility_ewma": 0.02, "effective_ttl_seconds": 600.0}
+    repo.upsert_prices([plain, tracked])
+    repo.upsert_prices([tracked | {"symbol": "IOZ"}, plain | {"symbol": "VAS"}])
+    prices = repo.get_prices(["CSL", "BHP", "IOZ", "VAS"])
+    assert prices["BHP"]["volatility_ewma"] == 0.02
+    assert prices["IOZ"]["effective_ttl_seconds"] == 600.0
+    assert prices["VAS"].get("volatility_ewma") is None
+    assert prices["CSL"]["price"] == 250.25
+
+
+def test_get_prices_handles_long_symbol_lists(repo):
+    symbols = [f"S{idx:04d}" for idx in range(1200)]
+    repo.upsert_prices([_sample_price(symbol) for symbol in symbols])
+    prices = repo.get_prices(symbols + ["MISSING"])
+    assert len(prices) == 1200
+    assert prices["S1199"]["symbol"] == "S1199"
+
+
 def test_actionables_roundtrip(repo):
     actionable_id = repo.add_actionable(_sample_actionable())
     rows = repo.list_actionables()
@@ -165,6 +422,16 @@ def test_actionables_roundtrip(repo):
     assert active == []
 
 
+def test_update_actionables_bulk(repo):
+    first = repo.add_actionable(_sample_actionable("CSL"))
+    second = repo.add_actionable(_sample_actionable("BHP"))
+    third = repo.add_actionable(_sample_actionable("IOZ"))
+    repo.update_actionables([first, third], {"status": "DONE"})
+    done = {row["id"] for row in repo.list_actionables(status="DONE")}
+    assert done == {first, third}
+    assert second not in done
+
+
 def test_sqlite_migration_runs(tmp_path):
     db_path = tmp_path / "migrated.sqlite"
     repo = SQLiteRepository(db_path)
@@ -175,7 +442,48 @@ def test_sqlite_migration_runs(tmp_path):
     with sqlite3.connect(db_path) as conn:
         cur = conn.execute("SELECT version FROM schema_migrations")
         versions = {row[0] for row in cur.fetchall()}
-    assert "001" in versions
+    assert {"001", "005"} <= versions
+
+
+def test_sqlite_enables_wal(tmp_path):
+    repo = SQLiteRepository(tmp_path / "wal.sqlite")
+    try:
+        mode = repo._conn.execute("PRAGMA journal_mode;").fetchone()[0]
+        sync = repo._conn.execute("PRAGMA synchronous;").fetchone()[0]
+        timeout = repo._conn.execute("PRAGMA busy_timeout;").fetchone()[0]
+        cache = repo._conn.execute("PRAGMA cache_size;").fetchone()[0]
+    finally:
+        repo.close()
+    assert mode == "wal"
+    assert sync == 1  # NORMAL
+    assert timeout == 5000
+    assert cache == -64000
+
+
+def test_sqlite_price_cache_sees_other_connections(tmp_path):
+    path = tmp_path / "prices.sqlite"
+    repo = SQLiteRepository(path)
+    other = SQLiteRepository(path)
+    try:
+        repo.upsert_price(_sample_price("CSL"))
+        assert repo.get_prices(["CSL", "IOZ"])["CSL"]["price"] == 250.25
+        repo.get_prices(["CSL"])["CSL"]["price"] = 0.0
+        assert repo.get_prices(["CSL"])["CSL"]["price"] == 250.25
+
+        other.upsert_prices([_sample_price("CSL") | {"price": 255.0}, _sample_price("IOZ")])
+        prices = repo.get_prices(["CSL", "IOZ"])
+        assert prices["CSL"]["price"] == 255.0
+        assert "IOZ" in prices
+
+        with pytest.raises(RuntimeError):
+            with repo.batch():
+                repo.upsert_price(_sample_price("CSL") | {"price": 1.0})
+                assert repo.get_prices(["CSL"])["CSL"]["price"] == 1.0
+                raise RuntimeError("abort")
+        assert repo.get_prices(["CSL"])["CSL"]["price"] == 255.0
+    finally:
+        other.close()
+        repo.close()
 
 
 def _summarise(repo):
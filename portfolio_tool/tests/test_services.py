@@ -6,6 +6,7 @@ from zoneinfo import ZoneInfo
 from portfolio_tool.core.models import Transaction
 from portfolio_tool.core.services import PortfolioService
 from portfolio_tool.data.repo_json import JSONRepository
+from portfolio_tool.data.repo_sqlite import SQLiteRepository
 
 
 def aware(dt: datetime) -> datetime:
@@ -61,3 +62,165 @@ def test_portfolio_service_buy_then_sell_updates_lots(tmp_path):
     assert pos.avg_cost == pytest.approx(603.0 / 60.0)
     assert pos.mv == pytest.approx(900.0)
     assert pos.weight == pytest.approx(1.0)
+
+
+def test_rebuild_state_replays_transactions(tmp_path):
+    service = PortfolioService(JSONRepository(tmp_path / "repo.json"))
+    service.record_trade(
+        Transaction(
+            dt=aware(datetime(2023, 1, 1, 10, 0)),
+            type="BUY",
+            symbol="CSL",
+            qty=100.0,
+            price=10.0,
+            fees=5.0,
+        )
+    )
+    service.record_trade(
+        Transaction(
+            dt=aware(datetime(2023, 6, 1, 11, 0)),
+            type="SELL",
+            symbol="CSL",
+            qty=40.0,
+            price=12.0,
+        )
+    )
+    service.rebuild_state()
+
+    repo = service.repo
+    lots = repo.list_lots()
+    assert len(lots) == 1
+    assert lots[0]["qty_remaining"] == pytest.approx(60.0)
+    disposals = repo.list_disposals()
+    assert len(disposals) == 1
+    assert disposals[0]["lot_id"] == lots[0]["lot_id"]
+    assert disposals[0]["gain_loss"] == pytest.approx(78.0)
+
+
+def test_open_symbols_and_positions_share_one_aggregate(tmp_path):
+    repo = JSONRepository(tmp_path / "repo.json")
+    service = PortfolioService(repo)
+    service.record_trade(
+        Transaction(
+            dt=aware(datetime(2023, 1, 1, 10, 0)),
+            type="BUY",
+            symbol="CSL",
+            qty=10.0,
+            price=10.0,
+        )
+    )
+    calls = []
+    aggregate = repo.aggregate_open_lots
+    repo.aggregate_open_lots = lambda: calls.append(1) or aggregate()
+
+    assert service.open_symbols() == ["CSL"]
+    assert [pos.symbol for pos in service.compute_positions()] == ["CSL"]
+    assert len(calls) == 1
+
+    service.record_trade(
+        Transaction(
+            dt=aware(datetime(2023, 2, 1, 10, 0)),
+            type="BUY",
+            symbol="BHP",
+            qty=5.0,
+            price=40.0,
+        )
+    )
+    assert service.open_symbols() == ["BHP", "CSL"]
+    assert len(calls) == 2
+
+
+def _open_repo(tmp_path, backend: str):
+    if backend == "sqlite":
+        return SQLiteRepository(tmp_path / "repo.sqlite")
+    return JSONRepository(tmp_path / "repo.json")
+
+
+@pytest.mark.parametrize("backend", ["sqlite", "json"])
+def test_record_trade_rolls_back_failed_sell(tmp_path, backend):
+    repo = _open_repo(tmp_path, backend)
+    service = PortfolioService(repo)
+    service.record_trade(
+        Transaction(
+            dt=aware(datetime(2023, 1, 1, 10, 0)),
+            type="BUY",
+            symbol="CSL",
+            qty=10.0,
+            price=10.0,
+        )
+    )
+    with pytest.raises(ValueError):
+        service.record_trade(
+            Transaction(
+                dt=aware(datetime(2023, 2, 1, 10, 0)),
+                type="SELL",
+                symbol="CSL",
+                qty=50.0,
+                price=12.0,
+            )
+        )
+    assert [row["type"] for row in repo.list_transactions()] == ["BUY"]
+    assert repo.list_lots()[0]["qty_remaining"] == pytest.approx(10.0)
+    repo.close()
+
+    reopened = _open_repo(tmp_path, backend)
+    assert [row["type"] for row in reopened.list_transactions()] == ["BUY"]
+    PortfolioService(reopened).rebuild_state()
+    assert reopened.list_lots()[0]["qty_remaining"] == pytest.approx(10.0)
+    reopened.close()
+
+
+def _import_batch() -> list[Transaction]:
+    rows = [
+        (datetime(2023, 1, 1, 10, 0), "BUY", "CSL", 10.0, 10.0, 1.0),
+        (datetime(2023, 1, 2, 10, 0), "BUY", "BHP", 5.0, 40.0, 0.0),
+        (datetime(2023, 2, 1, 10, 0), "SELL", "CSL", 4.0, 12.0, 0.0),
+        (datetime(2023, 3, 1, 10, 0), "BUY", "CSL", 6.0, 11.0, 0.0),
+        (datetime(2023, 4, 1, 10, 0), "SELL", "CSL", 8.0, 13.0, 0.0),
+    ]
+    return [
+        Transaction(dt=aware(dt), type=kind, symbol=symbol, qty=qty, price=price, fees=fees)
+        for dt, kind, symbol, qty, price, fees in rows
+    ]
+
+
+def test_record_trades_matches_one_at_a_time(tmp_path):
+    single = PortfolioService(JSONRepository(tmp_path / "single.json"))
+    for txn in _import_batch():
+        single.record_trade(txn)
+    bulk = PortfolioService(SQLiteRepository(tmp_path / "bulk.sqlite"))
+    ids = bulk.record_trades(_import_batch())
+
+    assert ids == [1, 2, 3, 4, 5]
+    for repo in (single.repo, bulk.repo):
+        lots = repo.list_lots(symbol="CSL", only_open=True)
+        assert [lot["qty_remaining"] for lot in lots] == pytest.approx([4.0])
+
+    def disposals(repo):
+        return [
+            (row["sell_txn_id"], row["lot_id"], row["qty"], row["gain_loss"])
+            for row in repo.list_disposals()
+        ]
+
+    assert disposals(bulk.repo) == disposals(single.repo)
+    single.repo.close()
+    bulk.repo.close()
+
+
+@pytest.mark.parametrize("backend", ["sqlite", "json"])
+def test_record_trades_is_atomic(tmp_path, backend):
+    repo = _open_repo(tmp_path, backend)
+    service = PortfolioService(repo)
+    batch = _import_batch()
+    batch[-1].qty = 50.0
+    with pytest.raises(ValueError):
+        service.record_trades(batch)
+    assert repo.list_transactions() == []
+    assert repo.list_lots() == []
+    repo.close()
+
+    reopened = _open_repo(tmp_path, backend)
+    assert reopened.list_transactions() == []
+    assert reopened.list_lots() == []
+    assert reopened.list_disposals() == []
+    reopened.close()
@@ -54,39 +54,7 @@ def _synth_transactions(count: int, seed: int = 2024):
 
 
 def _seed_repo(repo, txns) -> None:
-    if isinstance(repo, SQLiteRepository):
-        columns = (
-            "dt",
-            "type",
-            "symbol",
-            "qty",
-            "price",
-            "fees",
-            "broker_ref",
-            "notes",
-            "exchange",
-        )
-        placeholders = ", ".join(["?"] * len(columns))
-        repo._conn.executemany(  # type: ignore[attr-defined]
-            f"""
-            INSERT INTO transactions ({', '.join(columns)})
-            VALUES ({placeholders});
-            """,
-            [tuple(txn.get(col) for col in columns) for txn in txns],
-        )
-        repo._conn.commit()  # type: ignore[attr-defined]
-    elif isinstance(repo, JSONRepository):
-        repo._state["transactions"] = []  # type: ignore[attr-defined]
-        next_id = 1
-        for txn in txns:
-            record = {"id": next_id, **txn}
-            repo._state["transactions"].append(record)  # type: ignore[attr-defined]
-            next_id += 1
-        repo._state["meta"]["next_ids"]["transactions"] = next_id  # type: ignore[attr-defined]
-        repo._persist()  # type: ignore[attr-defined]
-    else:  # pragma: no cover - fallback for future backends
-        for txn in txns:
-            repo.add_transaction(txn)
+    repo.add_transactions(txns)
     repo.close()
 
 